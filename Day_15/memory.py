@@ -2,42 +2,229 @@ import os
 import json
 import datetime
 import uuid  # <--- NEW IMPORT
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Compact the log once this many lines are dead (deleted entries + tombstones)
+# and they outnumber the live entries.
+COMPACT_MIN_DEAD = 50
+
+# One offset index per log file, shared by every HistoryManager in the process
+# (Streamlit creates a new HistoryManager on every rerun).
+_INDEXES = {}
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on a side-car .lock file, so several processes can share the log."""
+    with open(path + ".lock", "a+b") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _LogIndex:
+    """In-memory map of entry id -> byte offset of its line in the log."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, log_id=None):
+        self.offsets = {}      # Insertion order == chronological order
+        self.dead = 0          # Lines compaction would drop
+        self.scanned = 0       # Bytes of the log already indexed
+        self.log_id = log_id   # From the header line; changes on every compaction
+
 
 class HistoryManager:
+    """
+    Append-only JSONL history.
+    The first line is a header ({"log": <id>}) that changes whenever the
+    file is compacted. Saves append one line, deletes append a tombstone
+    ({"deleted": id}), and the file is rewritten only when enough dead
+    lines pile up.
+    """
+
     def __init__(self):
-        self.history_file = "agent_history.json"
+        self.history_file = "agent_history.jsonl"
+        self.legacy_file = "agent_history.json"
+        self._index = _INDEXES.setdefault(os.path.abspath(self.history_file), _LogIndex())
+        self._migrate_legacy()
+
+    # --- INTERNAL HELPERS (call with the file lock held) ---
+    def _migrate_legacy(self):
+        """One-time import of the old rewrite-whole-file JSON history."""
+        if os.path.exists(self.history_file) or not os.path.exists(self.legacy_file):
+            return
+        with file_lock(self.history_file):
+            if os.path.exists(self.history_file):
+                return
+            with open(self.legacy_file, 'r') as f:
+                history = json.load(f)
+            with open(self.history_file, 'ab') as f:
+                f.write(self._new_header())
+                for entry in history:
+                    f.write(self._encode(entry))
 
+    @staticmethod
+    def _encode(record):
+        return (json.dumps(record) + "\n").encode("utf-8")
+
+    def _new_header(self):
+        return self._encode({"log": str(uuid.uuid4())})
+
+    def _read_log_id(self):
+        with open(self.history_file, 'rb') as f:
+            try:
+                return json.loads(f.readline()).get("log")
+            except (ValueError, AttributeError):
+                return None
+
+    def _refresh_index(self):
+        """Indexes lines appended since the last scan (by this or another process)."""
+        index = self._index
+        if not os.path.exists(self.history_file):
+            index.reset()
+            return
+
+        log_id = self._read_log_id()
+        size = os.path.getsize(self.history_file)
+        if log_id != index.log_id or size < index.scanned:
+            # File was compacted or replaced: start over
+            index.reset(log_id)
+        if size == index.scanned:
+            return
+
+        with open(self.history_file, 'rb') as f:
+            f.seek(index.scanned)
+            offset = index.scanned
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Half-written line; picked up on the next scan
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+
+                if isinstance(record, dict) and "log" in record:
+                    pass  # Header line
+                elif not isinstance(record, dict):
+                    index.dead += 1
+                elif "deleted" in record:
+                    index.dead += 2 if index.offsets.pop(record["deleted"], None) is not None else 1
+                else:
+                    if record.get("id") in index.offsets:
+                        index.dead += 1
+                    index.offsets[record.get("id")] = offset
+                offset += len(line)
+            index.scanned = offset
+
+    def _append(self, record):
+        self._refresh_index()
+        index = self._index
+        data = self._encode(record)
+        with open(self.history_file, 'ab') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                header = self._new_header()
+                f.write(header)
+                end = len(header)
+                index.reset(json.loads(header)["log"])
+                index.scanned = end   # The header is not a partial line
+            if end > index.scanned:
+                # A crashed writer left a partial line: close it off as a dead line
+                f.write(b"\n")
+                index.dead += 1
+                end += 1
+            f.write(data)
+        index.scanned = end + len(data)
+        return end
+
+    def _read_at(self, f, offset):
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def _maybe_compact(self):
+        index = self._index
+        if index.dead < COMPACT_MIN_DEAD or index.dead <= len(index.offsets):
+            return
+
+        tmp_file = self.history_file + ".tmp"
+        new_offsets = {}
+        header = self._new_header()
+        with open(self.history_file, 'rb') as src, open(tmp_file, 'wb') as dst:
+            dst.write(header)
+            for entry_id, offset in index.offsets.items():
+                src.seek(offset)
+                new_offsets[entry_id] = dst.tell()
+                dst.write(src.readline())
+            size = dst.tell()
+        os.replace(tmp_file, self.history_file)
+
+        index.reset(json.loads(header)["log"])
+        index.offsets = new_offsets
+        index.scanned = size
+
+    # --- PUBLIC API ---
     def load_history(self):
-        """Loads history from a JSON file if it exists."""
-        if os.path.exists(self.history_file):
-            with open(self.history_file, 'r') as f:
-                return json.load(f)
-        return []
+        """Loads all live history entries, oldest first."""
+        if not os.path.exists(self.history_file):
+            return []
+        with file_lock(self.history_file):
+            self._refresh_index()
+            with open(self.history_file, 'rb') as f:
+                return [self._read_at(f, offset) for offset in self._index.offsets.values()]
+
+    def get_entry(self, entry_id):
+        """Reads a single entry via the offset index, without parsing the rest of the file."""
+        if not os.path.exists(self.history_file):
+            return None
+        with file_lock(self.history_file):
+            self._refresh_index()
+            offset = self._index.offsets.get(entry_id)
+            if offset is None:
+                return None
+            with open(self.history_file, 'rb') as f:
+                return self._read_at(f, offset)
 
     def save_entry(self, input_text, mode, final_report, messages):
-        """Saves a new research session to memory."""
-        history = self.load_history()
-        
+        """Saves a new research session to memory (one appended line)."""
         # --- FIX: Use UUID for unique IDs instead of length ---
         entry = {
-            "id": str(uuid.uuid4()), 
+            "id": str(uuid.uuid4()),
             "timestamp": str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M")),
             "mode": mode,
             "input": input_text,
             "report": final_report,
             "chat_history": messages
         }
-        history.append(entry)
-        with open(self.history_file, 'w') as f:
-            json.dump(history, f)
+        with file_lock(self.history_file):
+            offset = self._append(entry)
+            self._index.offsets[entry["id"]] = offset
         return entry
 
     def delete_entry(self, entry_id):
-        """Deletes a specific entry by ID."""
-        history = self.load_history()
-        # Filter out the item with the matching ID
-        new_history = [item for item in history if item['id'] != entry_id]
-        
-        with open(self.history_file, 'w') as f:
-            json.dump(new_history, f)
-        return new_history
\ No newline at end of file
+        """Deletes a specific entry by ID (appends a tombstone)."""
+        with file_lock(self.history_file):
+            self._refresh_index()
+            if entry_id not in self._index.offsets:
+                return
+            self._append({"deleted": entry_id})
+            del self._index.offsets[entry_id]
+            self._index.dead += 2
+            self._maybe_compact()
\ No newline at end of file
@@ -1,8 +1,19 @@
 import streamlit as st
+import uuid
+import time
 from datetime import datetime  # <--- Added for date formatting
 from memory import HistoryManager
-from utils import extract_pdf_text
-from graph_builder import build_graph
+from sqlite_memory import SQLiteHistoryManager
+from utils import extract_pdf_document
+from pdf_cache import get_pdf_cache
+from retrieval import build_pdf_index, build_pdf_digest, retrieve_pdf_context
+from writer_agent import FenceCleaner, MAP_TAG
+from tracing import NodeTimer
+from graph_builder import get_graph, get_llm
+from conversation_memory import ConversationMemory
+from search_cache import get_search_cache
+from report_cache import ReportCache, DEFAULT_THRESHOLD, MIN_THRESHOLD
+from router_agent import ROUTE_SEARCH
 
 # ==========================================
 # 🔐 SECURE API KEY HANDLING
@@ -29,14 +40,62 @@ st.set_page_config(
 )
 
 # --- INITIALIZATION ---
-memory = HistoryManager()
+HISTORY_PAGE_SIZE = 20   # Sidebar entries fetched per "Load more"
+PDF_INDEX_CHAR_BUDGET = 2000000   # Max PDF text extracted and indexed at upload (~500 pages)
+PDF_TOP_K = 6                     # PDF chunks sent with each question
+
+# --- HISTORY BACKEND ---
+# MongoDB when MONGO_URI is configured (Streamlit Cloud), otherwise a local SQLite file
+try:
+    use_mongo = "MONGO_URI" in st.secrets
+except Exception:
+    use_mongo = False
+memory = HistoryManager() if use_mongo else SQLiteHistoryManager()
+
+
+@st.cache_resource
+def get_report_cache(_history):
+    """One report cache per process; the leading underscore keeps Streamlit from hashing the backend."""
+    return ReportCache(_history)
+
+
+report_cache = get_report_cache(memory)
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
-if "pdf_context" not in st.session_state:
-    st.session_state.pdf_context = ""
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())   # Groups the turns of one conversation
+if "pdf_index" not in st.session_state:
+    st.session_state.pdf_index = None   # Chunks + BM25 index of the uploaded PDF
+if "pdf_digest" not in st.session_state:
+    st.session_state.pdf_digest = ""     # Title/abstract/headings/key terms for the planner
 if "pdf_name" not in st.session_state:
     st.session_state.pdf_name = None
+if "pdf_cache_hit" not in st.session_state:
+    st.session_state.pdf_cache_hit = False
+if "history_limit" not in st.session_state:
+    st.session_state.history_limit = HISTORY_PAGE_SIZE
+if "metrics" not in st.session_state:
+    st.session_state.metrics = []   # Per-request timings (time-to-first-token etc.)
+if "last_sources" not in st.session_state:
+    st.session_state.last_sources = {"search_mode": None, "sources": []}   # Reused by the router when they still cover a question
+if "conversation" not in st.session_state:
+    st.session_state.conversation = ConversationMemory()   # Rolling summary + recent window
+
+# --- CONVERSATION MEMORY ---
+# Pick up a summary refreshed in the background since the last run and persist it
+conversation = st.session_state.conversation
+if conversation.collect():
+    memory.save_summary(st.session_state.session_id, conversation.summary, conversation.summarized_count)
+
+# Status box labels for each graph node
+NODE_LABELS = {
+    "router": "🧭 Router",
+    "planner": "🧠 Planner",
+    "searcher": "🔎 Searcher",
+    "reranker": "📊 Reranker",
+    "writer": "✍️ Writer",
+}
 
 # --- CSS STYLING ---
 # 1. Center Input if Chat is Empty
@@ -64,13 +123,81 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# --- HISTORY ENTRY WIDGET (used by the list and by search results) ---
+def render_history_entry(entry, key_prefix=""):
+    # --- SMART DATE LOGIC ---
+    try:
+        # 1. Stored as a datetime (older entries: a formatted string)
+        dt_obj = entry['timestamp']
+        if isinstance(dt_obj, str):
+            dt_obj = datetime.strptime(dt_obj, "%Y-%m-%d %H:%M")
+    
+        # 2. Get current date
+        now = datetime.now()
+    
+        # 3. Compare dates
+        if dt_obj.date() == now.date():
+            # If TODAY: Show 12-hour time (e.g., "02:30 PM")
+            time_label = dt_obj.strftime("%I:%M %p")
+        else:
+            # If OLDER: Show Date (e.g., "27 Oct 2023")
+            time_label = dt_obj.strftime("%d %b %Y")
+        
+    except Exception:
+        # Fallback if format is wrong
+        time_label = str(entry['timestamp'])
+
+    # Create the label
+    short_input = entry['input'][:18] + "..." if len(entry['input']) > 18 else entry['input']
+    label = f"{time_label} - {short_input}"
+
+    # --- EXPANDER LAYOUT (Same as before) ---
+    with st.expander(label):
+        st.caption(f"**Full Topic:** {entry['input']}")
+        if entry.get('snippet'):
+            st.caption(f"…{entry['snippet']}…")
+    
+        col1, col2, col3 = st.columns(3)
+    
+        with col1:
+            if st.button("👁️ View", key=f"{key_prefix}view_{entry['id']}"):
+                @st.dialog("📜 Research Report")
+                def show_report():
+                    full_entry = memory.get_entry(entry['id']) or {}
+                    st.subheader(entry['input'])
+                    st.markdown(full_entry.get('report', "Report not found."))
+                show_report()
+            
+        with col2:
+            if st.button("🔄 Resume", key=f"{key_prefix}load_{entry['id']}"):
+                # Continue the same session so new turns are appended to it
+                session_id = entry.get('session_id') or entry['id']
+                st.session_state.messages = memory.load_session(session_id)
+                st.session_state.session_id = session_id
+                st.session_state.last_sources = {"search_mode": None, "sources": []}
+                saved = memory.load_summary(session_id)
+                st.session_state.conversation = ConversationMemory(*saved) if saved else ConversationMemory()
+                # Long transcripts without a saved summary get one built in the background
+                st.session_state.conversation.maybe_refresh(st.session_state.messages, get_llm(OPENROUTER_API_KEY))
+                st.success("Chat Loaded!")
+                st.rerun()
+            
+        with col3:
+            if st.button("🗑️ Delete", key=f"{key_prefix}del_{entry['id']}"):
+                memory.delete_entry(entry['id'])
+                st.rerun()
+
 # --- SIDEBAR ---
 with st.sidebar:
     
     # NEW CHAT BUTTON
     if st.button("➕ Start New Chat"):
         st.session_state.messages = []
-        st.session_state.pdf_context = ""
+        st.session_state.session_id = str(uuid.uuid4())
+        st.session_state.conversation = ConversationMemory()
+        st.session_state.last_sources = {"search_mode": None, "sources": []}
+        st.session_state.pdf_index = None
+        st.session_state.pdf_digest = ""
         st.session_state.pdf_name = None
         st.rerun()
 
@@ -91,6 +218,26 @@ with st.sidebar:
         
         st.divider()
 
+        st.subheader("⚡ Search Cache")
+        cache_stats = get_search_cache().stats()
+        st.caption(
+            f"Hits: {cache_stats['hits']} | Misses: {cache_stats['misses']} | "
+            f"Hit rate: {cache_stats['hit_rate']:.0%} | Saved: ~{cache_stats['saved_seconds']}s"
+        )
+
+        st.divider()
+
+        st.subheader("♻️ Report Cache")
+        cache_threshold = st.slider("Similarity needed to reuse a report:", MIN_THRESHOLD, 1.00, DEFAULT_THRESHOLD, 0.01)
+        refresh_report = st.checkbox("🔄 Refresh (don't reuse past reports, plans or search results)", value=False)
+        report_stats = report_cache.stats()
+        st.caption(
+            f"Hits: {report_stats['hits']} | Misses: {report_stats['misses']} | "
+            f"Indexed topics: {report_stats['indexed']}"
+        )
+
+        st.divider()
+
         st.subheader("📝 Output Length")
         report_type = st.radio("Detail Level:", ["Detailed Report", "Short Summary"], index=0)
         length_map = {"Detailed Report": "Detailed", "Short Summary": "Short"}
@@ -105,82 +252,59 @@ with st.sidebar:
             uploaded_file = st.file_uploader("Choose PDF", type=["pdf"])
             if uploaded_file:
                 with st.spinner("Extracting text..."):
-                    raw_text = extract_pdf_text(uploaded_file)
-                    st.session_state.pdf_context = raw_text
+                    progress_bar = st.progress(0.0, text="Reading pages...")
+
+                    def show_progress(done, total):
+                        progress_bar.progress(done / total, text=f"Reading pages... {done}/{total}")
+
+                    # The whole paper is indexed; each question only sends its best chunks
+                    document = extract_pdf_document(
+                        uploaded_file, max_chars=PDF_INDEX_CHAR_BUDGET,
+                        progress_callback=show_progress, cache=get_pdf_cache()
+                    )
+                    st.session_state.pdf_index = build_pdf_index(document["pages"])
+                    st.session_state.pdf_digest = build_pdf_digest(document["pages"], document["metadata"])
                     st.session_state.pdf_name = uploaded_file.name
+                    st.session_state.pdf_cache_hit = document["cache_hit"]
                     st.rerun()
         else:
             st.success(f"**Active File:**\n{st.session_state.pdf_name}")
+            if st.session_state.pdf_cache_hit:
+                st.caption("⚡ Loaded instantly from the PDF cache")
             st.markdown("The agent will now prioritize this document in its research.")
             
             if st.button("❌ Remove PDF", type="primary"):
-                st.session_state.pdf_context = ""
+                st.session_state.pdf_index = None
+                st.session_state.pdf_digest = ""
                 st.session_state.pdf_name = None
                 st.rerun()
 
         # --- TAB 3: HISTORY (Modified for Smart Date/Time) ---
     with tab_history:
         st.subheader("Past Researches")
-        history = memory.load_history()
+
+        # --- FULL-TEXT SEARCH ---
+        search_text = st.text_input("🔍 Search past reports", placeholder="e.g. solid-state batteries")
+        if search_text.strip():
+            matches = memory.search(search_text)
+            st.caption(f"{len(matches)} match(es)")
+            for entry in matches:
+                render_history_entry(entry, key_prefix="search_")
+            st.divider()
+
+        # Fetch one extra row to know whether a "Load more" button is needed
+        history = memory.list_entries(limit=st.session_state.history_limit + 1)
+        has_more = len(history) > st.session_state.history_limit
+        history = history[:st.session_state.history_limit]
         if not history:
             st.caption("No history yet.")
         else:
-            for entry in reversed(history):
-                # --- SMART DATE LOGIC ---
-                try:
-                    # 1. Parse the stored timestamp string
-                    dt_obj = datetime.strptime(entry['timestamp'], "%Y-%m-%d %H:%M")
-                    
-                    # 2. Get current date
-                    now = datetime.now()
-                    
-                    # 3. Compare dates
-                    if dt_obj.date() == now.date():
-                        # If TODAY: Show 12-hour time (e.g., "02:30 PM")
-                        time_label = dt_obj.strftime("%I:%M %p")
-                    else:
-                        # If OLDER: Show Date (e.g., "27 Oct 2023")
-                        time_label = dt_obj.strftime("%d %b %Y")
-                        
-                except Exception:
-                    # Fallback if format is wrong
-                    time_label = entry['timestamp']
-
-                # Create the label
-                short_input = entry['input'][:18] + "..." if len(entry['input']) > 18 else entry['input']
-                label = f"{time_label} - {short_input}"
-                
-                # --- EXPANDER LAYOUT (Same as before) ---
-                with st.expander(label):
-                    st.caption(f"**Full Topic:** {entry['input']}")
-                    
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        if st.button("👁️ View", key=f"view_{entry['id']}"):
-                            @st.dialog("📜 Research Report")
-                            def show_report():
-                                st.subheader(entry['input'])
-                                st.markdown(entry['report'])
-                            show_report()
-                            
-                    with col2:
-                        if st.button("🔄 Resume", key=f"load_{entry['id']}"):
-                            saved_history = entry.get('chat_history', None)
-                            if saved_history:
-                                st.session_state.messages = saved_history
-                            else:
-                                st.session_state.messages = [
-                                    {"role": "user", "content": entry['input']},
-                                    {"role": "assistant", "content": entry['report']}
-                                ]
-                            st.success("Chat Loaded!")
-                            st.rerun()
-                            
-                    with col3:
-                        if st.button("🗑️ Delete", key=f"del_{entry['id']}"):
-                            memory.delete_entry(entry['id'])
-                            st.rerun()
+            for entry in history:
+                render_history_entry(entry)
+
+            if has_more and st.button("⬇️ Load more"):
+                st.session_state.history_limit += HISTORY_PAGE_SIZE
+                st.rerun()
 
 # --- MAIN CHAT ---
 if not st.session_state.messages:
@@ -212,50 +336,146 @@ if prompt := st.chat_input(placeholder):
 if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
     prompt = st.session_state.messages[-1]["content"]
     
-    # --- BALANCED HISTORY STRATEGY ---
-    recent_messages = st.session_state.messages[:-1] 
-    formatted_history = []
-    
-    for i, msg in enumerate(reversed(recent_messages)):
-        role = msg['role'].upper()
-        content = msg['content']
-        if i > 2 and len(content) > 500:
-             content = content[:200] + "... [Old Context Truncated]"
-        formatted_history.insert(0, f"{role}: {content}")
-
-    final_history_str = "\n".join(formatted_history[-10:])
+    # --- ROLLING MEMORY ---
+    # Summary of older turns + the recent turns verbatim; stays about the same size however long the chat gets
+    final_history_str = st.session_state.conversation.history_for_prompt(st.session_state.messages[:-1])
     
-    final_topic = prompt
     mode = "Text"
-    if st.session_state.pdf_context:
-        pdf_limit = 100000 
-        final_topic = f"User Query: {prompt}\n\nReference PDF Content: {st.session_state.pdf_context[:pdf_limit]}"
+    run_settings = {"search_mode": search_mode, "summary_length": selected_length}
+    # Sources found in another search mode (Academic vs General Web) are not reused
+    last_sources = st.session_state.last_sources
+    prior_sources = last_sources["sources"] if last_sources["search_mode"] == search_mode and not refresh_report else []
+    pdf_excerpts = ""
+    if st.session_state.pdf_index:
+        # Only the top-k chunks relevant to this question go to the writer;
+        # the planner gets the small digest built at upload
+        pdf_excerpts = retrieve_pdf_context(st.session_state.pdf_index, prompt, top_k=PDF_TOP_K)
         mode = "PDF"
 
     with st.chat_message("assistant", avatar="🤖"):
         try:
-            app_graph = build_graph(OPENROUTER_API_KEY, TAVILY_API_KEY)
-            
-            # Status Indicator
-            status_placeholder = st.status("🤖 Agent Working...", expanded=False)
-            status_placeholder.write("🧠 Planner: Planning strategy...")
-            status_placeholder.write("🔎 Searcher: Gathering papers via Tavily...")
-            status_placeholder.write(f"✍️ Writer: Drafting {search_mode}...")
+            # --- REPORT CACHE ---
+            # A fresh report on the same standalone topic (first turn, no PDF) is reused as-is
+            cached = None
+            if mode == "Text" and len(st.session_state.messages) == 1 and not refresh_report:
+                lookup_start = time.perf_counter()
+                cached = report_cache.lookup(prompt, run_settings, threshold=cache_threshold)
+                lookup_ms = (time.perf_counter() - lookup_start) * 1000
+
+            if cached:
+                report = cached["report"]
+                st.markdown(report)
+                st.caption(
+                    f"⚡ Reused a report from {cached['age_s'] / 3600:.1f}h ago on \"{cached['input']}\" "
+                    f"(similarity {cached['similarity']:.2f}, {lookup_ms:.0f} ms). Tick \"Refresh\" for a new one."
+                )
+            else:
+                app_graph = get_graph(OPENROUTER_API_KEY, TAVILY_API_KEY)
             
-            final_state = app_graph.invoke({
-                "topic": final_topic,
-                "chat_history": final_history_str, 
-                "summary_length": selected_length,
-                "search_mode": search_mode 
-            })
+                # Status Indicator (filled live from the graph's task events)
+                status_placeholder = st.status("🤖 Agent Working...", expanded=False)
             
-            report = final_state['final_report']
-            status_placeholder.update(label="✅ Complete", state="complete", expanded=False)
+                # --- STREAMING EXECUTION ---
+                # "updates" gives each node's state changes, "messages" gives LLM tokens,
+                # "debug" gives task start/finish events for the per-node timing
+                final_state = {}
+                timer = NodeTimer()
+
+                def stream_report():
+                    cleaner = FenceCleaner()
+                    for stream_mode, payload in app_graph.stream({
+                        "topic": prompt,
+                        "pdf_context": pdf_excerpts,
+                        "pdf_digest": st.session_state.pdf_digest,
+                        "chat_history": final_history_str, 
+                        "summary_length": selected_length,
+                        "search_mode": search_mode,
+                        "prior_sources": prior_sources,
+                        "refresh": refresh_report
+                    }, stream_mode=["updates", "messages", "debug"]):
+                        if stream_mode == "updates":
+                            for node_update in payload.values():
+                                for key, value in (node_update or {}).items():
+                                    if key in ("search_results", "search_errors"):
+                                        # Appended to by each parallel searcher task
+                                        final_state.setdefault(key, []).extend(value)
+                                    else:
+                                        final_state[key] = value
+                        elif stream_mode == "debug":
+                            task = payload.get("payload", {})
+                            label = NODE_LABELS.get(task.get("name"), task.get("name"))
+                            if payload.get("type") == "task":
+                                timer.start(task.get("id"), task.get("name"))
+                                status_placeholder.update(label=f"{label}: running...")
+                            elif payload.get("type") == "task_result":
+                                node, duration = timer.end(task.get("id"), task.get("error"))
+                                if node:
+                                    status_placeholder.write(f"{label}: done in {duration:.1f}s")
+                        else:
+                            chunk, meta = payload
+                            if meta.get("langgraph_node") != "writer" or not isinstance(chunk.content, str):
+                                continue
+                            if MAP_TAG in meta.get("tags", []):
+                                continue  # Map-step notes, not the report
+                            text = cleaner.feed(chunk.content)
+                            if text:
+                                if "ttft_s" not in timer.metrics:
+                                    timer.record("ttft_s", round(timer.elapsed(), 3))
+                                yield text
+                    tail = cleaner.flush()
+                    if tail:
+                        yield tail
+
+                streamed = st.write_stream(stream_report())
+                report = final_state.get('final_report') or streamed
             
-            st.markdown(report)
+                # --- DEDUP REPORT ---
+                dedup_stats = final_state.get('dedup_stats') or {}
+                if dedup_stats.get('removed'):
+                    timer.record("dedup", dedup_stats)
+                    status_placeholder.write(
+                        f"🧹 Removed {dedup_stats['removed']} duplicate source(s), "
+                        f"{dedup_stats['bytes_saved'] / 1024:.1f} KB saved"
+                    )
+
+                # --- FAILED SEARCHES ---
+                search_errors = final_state.get('search_errors') or []
+                if search_errors:
+                    timer.record("search_errors", search_errors)
+                    for error in search_errors:
+                        status_placeholder.write(f"⚠️ {error}")
+                    if not final_state.get('sources'):
+                        st.warning("⚠️ Web search failed, so this answer is not backed by sources.")
+
+                # --- ROUTING ---
+                route = final_state.get('route', ROUTE_SEARCH)
+                timer.record("route", route)
+                if route != ROUTE_SEARCH:
+                    status_placeholder.write(f"🧭 Skipped web search: {final_state.get('route_reason', route)}")
+                if final_state.get('sources'):
+                    st.session_state.last_sources = {"search_mode": search_mode, "sources": final_state['sources']}
+
+                # --- LATENCY BREAKDOWN ---
+                timing = timer.write_log()
+                st.session_state.metrics.append(timing)
+                status_placeholder.update(label=f"✅ Complete in {timing['total_s']:.1f}s", state="complete", expanded=False)
+                breakdown = " | ".join(f"{NODE_LABELS.get(n, n)} {t:.1f}s" for n, t in timing["per_node_s"].items())
+                if "ttft_s" in timing:
+                    breakdown = f"First token: {timing['ttft_s']:.1f}s | {breakdown}"
+                st.caption(f"⏱️ {breakdown}")
             
             st.session_state.messages.append({"role": "assistant", "content": report})
-            memory.save_entry(prompt, mode, report, st.session_state.messages)
+            # Bookkeeping for the report cache: only first turns are reusable, and a
+            # copy served from the cache is never indexed itself (see report_cache.is_indexable)
+            entry_settings = dict(run_settings, first_turn=len(st.session_state.messages) == 2)
+            if cached:
+                entry_settings["cached_from"] = cached["id"]
+            entry = memory.save_entry(prompt, mode, report, st.session_state.session_id, settings=entry_settings)
+            if entry:
+                report_cache.add(entry)
+
+            # Fold turns that left the recent window into the summary, off the request path
+            st.session_state.conversation.maybe_refresh(st.session_state.messages, get_llm(OPENROUTER_API_KEY))
             
         except Exception as e:
             st.error(f"An error occurred: {e}")
\ No newline at end of file
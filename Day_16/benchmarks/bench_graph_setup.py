@@ -0,0 +1,61 @@
+"""
+Per-request setup cost: building the clients and graph on every prompt
+(before) vs the cached graph_builder.get_graph (after).
+Usage: python benchmarks/bench_graph_setup.py [requests]
+Needs langgraph, langchain-openai and tavily-python. Dummy keys are used;
+constructing the clients makes no network calls.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_builder  # noqa: E402
+from graph_builder import build_graph, get_graph  # noqa: E402
+
+OPENROUTER_KEY = "sk-or-benchmark"
+TAVILY_KEY = "tvly-benchmark"
+
+
+def per_request_build():
+    """Before: a new ChatOpenAI, TavilyClient and compiled graph for every prompt."""
+    graph_builder.get_llm.cache_clear()
+    graph_builder.get_tavily_client.cache_clear()
+    return build_graph(OPENROUTER_KEY, TAVILY_KEY)
+
+
+def shared_clients_build():
+    """Shared clients, but the graph is still compiled for every prompt."""
+    return build_graph(OPENROUTER_KEY, TAVILY_KEY)
+
+
+def cached_graph():
+    """After: what app.py calls; a dict lookup once the first prompt has built it."""
+    return get_graph(OPENROUTER_KEY, TAVILY_KEY)
+
+
+CASES = [
+    ("before: build_graph per request", per_request_build),
+    ("build_graph, shared clients", shared_clients_build),
+    ("after: get_graph (cached)", cached_graph),
+]
+
+
+def per_call_us(func, requests):
+    func()   # First call pays imports and the cached build
+    start = time.perf_counter()
+    for _ in range(requests):
+        func()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    # The Tavily client opens the search cache's SQLite file in the working directory
+    os.chdir(tempfile.mkdtemp())
+    print(f"{requests} simulated requests")
+    for name, func in CASES:
+        print(f"{name:<34} {per_call_us(func, requests):10.1f} µs/request")
+    assert cached_graph() is cached_graph(), "get_graph should return the shared instance"
@@ -0,0 +1,64 @@
+"""
+Time and peak memory of PDF text extraction (utils.iter_pdf_pages /
+utils.extract_pdf_text) against the old read-everything loop.
+Usage: python benchmarks/bench_pdf_extract.py [pages]
+Needs pypdf. Peak memory is what tracemalloc sees of Python allocations.
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import pypdf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_pdf import make_pdf  # noqa: E402
+from utils import DEFAULT_CHAR_BUDGET, extract_pdf_text, iter_pdf_pages  # noqa: E402
+
+
+def extract_all_concat(uploaded_file):
+    """The extractor before the budget: every page, joined with +=."""
+    pdf_reader = pypdf.PdfReader(uploaded_file)
+    text = ""
+    for page in pdf_reader.pages:
+        text += page.extract_text() + "\n"
+    return text
+
+
+def stream_pages(uploaded_file):
+    """Walks every page through iter_pdf_pages, keeping only a running count."""
+    return sum(len(text) for text in iter_pdf_pages(uploaded_file))
+
+
+CASES = [
+    ("before: all pages, += concat", extract_all_concat),
+    ("iter_pdf_pages, streamed", stream_pages),
+    ("extract_pdf_text, whole document", lambda f: extract_pdf_text(f, max_chars=None, workers=1)),
+    (f"extract_pdf_text, {DEFAULT_CHAR_BUDGET} char budget", lambda f: extract_pdf_text(f, workers=1)),
+]
+
+
+def measure(func, pdf_bytes, runs=3):
+    """Returns (best seconds, peak MiB); the peak comes from a separate traced run."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(io.BytesIO(pdf_bytes))
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(io.BytesIO(pdf_bytes))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20
+
+
+if __name__ == "__main__":
+    num_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    pdf_bytes = make_pdf(num_pages)
+    print(f"{num_pages} pages, {len(pdf_bytes) / 2**20:.1f} MiB PDF")
+    for name, func in CASES:
+        seconds, peak_mib = measure(func, pdf_bytes)
+        print(f"{name:<42} {seconds:6.2f}s  peak {peak_mib:6.1f} MiB")
@@ -0,0 +1,40 @@
+"""
+Serial vs process-pool PDF extraction (utils.extract_pdf_pages).
+Usage: python benchmarks/bench_pdf_parallel.py [pages] [workers]
+Needs pypdf; the speedup only shows on a machine with several cores.
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_pdf import make_pdf  # noqa: E402
+from utils import extract_pdf_pages  # noqa: E402
+
+
+def timed(pdf_bytes, workers, runs=3):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        pages = extract_pdf_pages(io.BytesIO(pdf_bytes), workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best, pages
+
+
+if __name__ == "__main__":
+    num_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    pdf_bytes = make_pdf(num_pages)
+
+    # Warm the pool first so the parallel timing excludes process start-up
+    extract_pdf_pages(io.BytesIO(pdf_bytes), workers=workers)
+
+    serial_s, serial_pages = timed(pdf_bytes, workers=1)
+    parallel_s, parallel_pages = timed(pdf_bytes, workers=workers)
+    assert serial_pages == parallel_pages, "parallel extraction changed the text or page order"
+
+    print(f"{num_pages} pages, {os.cpu_count()} CPU(s), {workers} worker(s)")
+    print(f"serial:   {serial_s:.2f}s")
+    print(f"parallel: {parallel_s:.2f}s  ({serial_s / parallel_s:.2f}x)")
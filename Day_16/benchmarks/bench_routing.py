@@ -0,0 +1,147 @@
+"""
+LLM and Tavily calls over a scripted 10-turn conversation: the routed
+graph (router_agent) against the fixed planner -> search -> writer chain.
+Both run the real graph_builder.build_graph with a scripted LLM and a
+counting fake Tavily client; turns are fed in the way app.py does.
+Usage: python benchmarks/bench_routing.py
+Needs langgraph and langchain-core; no API keys or network.
+"""
+import os
+import re
+import sys
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_builder  # noqa: E402
+import planner_agent  # noqa: E402
+from conversation_memory import ConversationMemory  # noqa: E402
+from retrieval import build_pdf_digest, build_pdf_index, retrieve_pdf_context  # noqa: E402
+from router_agent import ROUTE_SEARCH, router_node  # noqa: E402
+
+PDF_TOP_K = 6   # Same as app.PDF_TOP_K
+SEARCH_MODE = "General Web"
+
+# (request, upload the paper before this turn)
+SCRIPT = [
+    ("solid state batteries energy density", False),
+    ("summarize that in three bullet points", False),
+    ("what about the cost of solid state batteries", False),
+    ("explain it simpler", False),
+    ("best pizza in new york", False),
+    ("tell me more", False),
+    ("what does the paper conclude about electrolyte degradation", True),
+    ("summarize the paper results", False),
+    ("which cathode materials does the study test", False),
+    ("latest solid state battery startups funding 2025", False),
+]
+
+# What the fake search returns, picked by keyword in the query
+SEARCH_CORPUS = {
+    "batter": "Solid state batteries replace the liquid electrolyte with a solid one. Energy density "
+              "could reach 500 Wh/kg, but cost and manufacturing at scale remain the main hurdles; "
+              "startups raised record funding in 2025.",
+    "pizza": "New York pizza: thin, foldable slices. The best spots include classic coal-oven pizzerias "
+             "in Brooklyn and Manhattan.",
+}
+
+PAPER_PAGES = [
+    "Degradation of Sulfide Electrolytes in Solid State Cells\n\nAbstract\nWe study electrolyte "
+    "degradation at the cathode interface of solid state cells over 500 cycles.",
+    "1 Introduction\nSulfide electrolytes offer high ionic conductivity but degrade at high voltage.\n\n"
+    "2 Methods\nWe test three cathode materials: NMC811, LFP and LCO, each with a coated interface.",
+    "3 Results\nCapacity retention after 500 cycles was 91% with NMC811 and a coated interface.\n\n"
+    "4 Conclusions\nWe conclude that interface coatings slow electrolyte degradation and are needed "
+    "for long cycle life.",
+]
+
+REQUEST_RE = re.compile(r"CURRENT USER (?:REQUEST|INPUT):\s*(.+)")
+
+
+class ScriptedLLM(BaseChatModel):
+    """Plans three queries from the request, writes a one-line report, counts calls."""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def _generate(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        self.calls += 1
+        prompt = messages[-1].content
+        request = REQUEST_RE.search(prompt).group(1).strip()
+        if "Research Planner" in prompt:
+            text = f"{request}\n{request} latest research\n{request} challenges"
+        else:
+            text = f"Report on {request}."
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+class CountingSearchClient:
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query, **kwargs):
+        self.calls += 1
+        results = [
+            {"title": f"{key} source {self.calls}", "url": f"https://example.com/{key}/{self.calls}",
+             "content": content, "score": 0.5}
+            for key, content in SEARCH_CORPUS.items() if key in query.lower()
+        ]
+        return {"results": results}
+
+
+def always_search(state):
+    """The chain before the router: every turn goes through the planner and search."""
+    return {"route": ROUTE_SEARCH, "route_reason": "fixed chain"}
+
+
+def run_conversation(routed):
+    """Plays SCRIPT like app.py does. Returns (routes, LLM calls, Tavily calls)."""
+    llm, client = ScriptedLLM(), CountingSearchClient()
+    graph_builder.get_llm = lambda *args, **kwargs: llm
+    graph_builder.get_tavily_client = lambda key: client
+    graph_builder.router_node = router_node if routed else always_search
+    planner_agent._plan_cache.clear()
+    graph = graph_builder.build_graph("sk-or-benchmark", "tvly-benchmark")
+
+    messages, routes = [], []
+    conversation = ConversationMemory()
+    last_sources, pdf_index, pdf_digest = [], None, ""
+    for request, upload in SCRIPT:
+        if upload:
+            pdf_index, pdf_digest = build_pdf_index(PAPER_PAGES), build_pdf_digest(PAPER_PAGES)
+        messages.append({"role": "user", "content": request})
+        state = graph.invoke({
+            "topic": request,
+            "pdf_context": retrieve_pdf_context(pdf_index, request, top_k=PDF_TOP_K) if pdf_index else "",
+            "pdf_digest": pdf_digest,
+            "chat_history": conversation.history_for_prompt(messages[:-1]),
+            "summary_length": "Short",
+            "search_mode": SEARCH_MODE,
+            "prior_sources": last_sources,
+            # Keeps the plan and search caches out of the count, so only routing differs
+            "refresh": True,
+        })
+        messages.append({"role": "assistant", "content": state["final_report"]})
+        if state.get("sources"):
+            last_sources = state["sources"]
+        routes.append(state["route"])
+    return routes, llm.calls, client.calls
+
+
+if __name__ == "__main__":
+    _, fixed_llm, fixed_tavily = run_conversation(routed=False)
+    routes, routed_llm, routed_tavily = run_conversation(routed=True)
+
+    for (request, _), route in zip(SCRIPT, routes):
+        print(f"{route:<9} {request}")
+    skipped = sum(route != ROUTE_SEARCH for route in routes)
+    print(f"\nfixed chain: {fixed_llm:>3} LLM calls, {fixed_tavily:>3} Tavily calls")
+    print(f"routed:      {routed_llm:>3} LLM calls, {routed_tavily:>3} Tavily calls "
+          f"({skipped} of {len(SCRIPT)} turns skipped search)")
@@ -0,0 +1,89 @@
+"""
+Wall time of the search step for 3/10/30 planned queries, run through the
+real graph (graph_builder.build_graph) with a fake Tavily client that
+sleeps for a fixed latency, and a fake LLM.
+Usage: python benchmarks/bench_search_concurrency.py [latency_ms] [concurrency]
+Needs langgraph and langchain-core; no API keys or network.
+"""
+import os
+import sys
+import threading
+import time
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_builder  # noqa: E402
+from searcher_agent import DEFAULT_MAX_CONCURRENCY  # noqa: E402
+
+QUERY_COUNTS = (3, 10, 30)
+
+
+class SleepingSearchClient:
+    """Answers every query after latency_s, tracking how many are in flight."""
+
+    def __init__(self, latency_s):
+        self.latency_s = latency_s
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def search(self, query, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(self.latency_s)
+        with self._lock:
+            self.in_flight -= 1
+        return {"results": [{"title": query, "url": f"https://example.com/{self.calls}",
+                             "content": f"Findings for {query}.", "score": 0.5}]}
+
+
+def fake_llm(num_queries):
+    """Planner and writer share it: every call answers with num_queries lines."""
+    plan = "\n".join(f"benchmark query {i}" for i in range(num_queries))
+    return GenericFakeChatModel(messages=iter(lambda: AIMessage(content=plan), None))
+
+
+def run(num_queries, concurrency, latency_s):
+    """Returns (seconds in the searcher step, Tavily calls, peak requests in flight)."""
+    client = SleepingSearchClient(latency_s)
+    graph_builder.get_tavily_client = lambda key: client
+    graph_builder.get_llm = lambda *args, **kwargs: fake_llm(num_queries)
+    graph = graph_builder.build_graph("sk-or-benchmark", "tvly-benchmark", search_concurrency=concurrency,
+                                      num_queries=num_queries)
+
+    started, finished = {}, {}
+    for payload in graph.stream({
+        "topic": f"benchmark topic {num_queries} {concurrency}",
+        "pdf_context": "",
+        "pdf_digest": "",
+        "chat_history": "",
+        "summary_length": "Short (Concise)",
+        "search_mode": "General Web",
+        "prior_sources": [],
+    }, stream_mode="debug"):
+        task = payload.get("payload", {})
+        if task.get("name") != "searcher":
+            continue
+        if payload["type"] == "task":
+            started.setdefault("first", time.perf_counter())
+        elif payload["type"] == "task_result":
+            finished["last"] = time.perf_counter()
+    return finished["last"] - started["first"], client.calls, client.peak_in_flight
+
+
+if __name__ == "__main__":
+    latency_s = (float(sys.argv[1]) if len(sys.argv) > 1 else 200) / 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MAX_CONCURRENCY
+    print(f"{latency_s * 1000:.0f} ms per search, max_concurrency={concurrency}")
+    for num_queries in QUERY_COUNTS:
+        serial_s = num_queries * latency_s
+        seconds, calls, peak = run(num_queries, concurrency, latency_s)
+        assert calls == num_queries, f"expected {num_queries} searches, got {calls}"
+        assert peak <= concurrency, "more requests in flight than max_concurrency allows"
+        print(f"{num_queries:>3} queries: {seconds:5.2f}s  (serial {serial_s:5.2f}s)  peak in flight {peak}")
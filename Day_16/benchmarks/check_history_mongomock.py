@@ -0,0 +1,124 @@
+"""
+Sidebar history paging (memory.HistoryManager.list_entries / get_entry)
+against an in-memory mongomock collection with thousands of entries.
+Usage: python benchmarks/check_history_mongomock.py [entries]
+Needs mongomock and streamlit; no MongoDB server or secrets are used.
+"""
+import datetime
+import os
+import sys
+import time
+import uuid
+
+import mongomock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import memory  # noqa: E402
+from memory import LISTING_PROJECTION  # noqa: E402
+
+PAGE_SIZE = 20              # Same as app.HISTORY_PAGE_SIZE
+REPORT_CHARS = 20_000       # Full reports are large; the listing must never carry them
+
+
+class CountingCollection:
+    """Passes everything to a mongomock collection, counting find_one calls."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.find_one_calls = 0
+
+    def find_one(self, *args, **kwargs):
+        self.find_one_calls += 1
+        return self.collection.find_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def make_collection(num_entries):
+    collection = mongomock.MongoClient()["research_agent_db"]["history"]
+    start = datetime.datetime(2024, 1, 1)
+    # Inserted in shuffled time order so sorting, not insertion order, is what gets checked
+    order = sorted(range(num_entries), key=lambda i: (i * 7919) % num_entries)
+    collection.insert_many([
+        {
+            "id": str(uuid.uuid4()),
+            "session_id": f"session-{i // 4}",
+            "timestamp": start + datetime.timedelta(minutes=i),
+            "mode": "Text",
+            "input": f"topic {i}",
+            "report": f"report {i} " + "x" * REPORT_CHARS,
+            "chat_history": [{"role": "user", "content": f"topic {i}"}],
+            "settings": {"search_mode": "General Web", "summary_length": "Short"},
+        }
+        for i in order
+    ])
+    return collection
+
+
+def load_page(manager, history_limit):
+    """What app.py does: one extra row decides whether "Load more" is shown."""
+    history = manager.list_entries(limit=history_limit + 1)
+    return history[:history_limit], len(history) > history_limit
+
+
+if __name__ == "__main__":
+    num_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    collection = CountingCollection(make_collection(num_entries))
+    memory.get_mongo_collection = lambda: collection
+    manager = memory.HistoryManager()
+
+    # --- PROJECTION ---
+    start = time.perf_counter()
+    page, has_more = load_page(manager, PAGE_SIZE)
+    first_page_s = time.perf_counter() - start
+    allowed = {field for field, keep in LISTING_PROJECTION.items() if keep}
+    for entry in page:
+        assert set(entry) <= allowed, f"listing fetched extra fields: {set(entry) - allowed}"
+        assert "report" not in entry and "chat_history" not in entry and "_id" not in entry
+
+    # --- NEWEST FIRST ---
+    newest = range(num_entries - 1, num_entries - 1 - PAGE_SIZE, -1)
+    assert [e["input"] for e in page] == [f"topic {i}" for i in newest]
+    timestamps = [e["timestamp"] for e in manager.list_entries(limit=num_entries)]
+    assert len(timestamps) == num_entries
+    assert timestamps == sorted(timestamps, reverse=True), "listing is not newest-first"
+
+    # --- LOAD MORE (limit + 1) ---
+    # mongomock sorts the whole collection on every call, so only the first
+    # clicks and the end of the history are walked
+    assert has_more, "first page should offer Load more"
+    for history_limit in range(2 * PAGE_SIZE, 5 * PAGE_SIZE + 1, PAGE_SIZE):
+        grown, has_more = load_page(manager, history_limit)
+        assert has_more and [e["id"] for e in grown[:len(page)]] == [e["id"] for e in page]
+        page = grown
+    _, has_more = load_page(manager, num_entries - 1)
+    assert has_more, "Load more hidden with one entry left"
+    exact, has_more = load_page(manager, num_entries)
+    assert len(exact) == num_entries and not has_more, "Load more shown with nothing left"
+    clicks = -(-num_entries // PAGE_SIZE) - 1
+
+    # skip pages line up with one big page, with no gaps or repeats
+    for skip in (0, PAGE_SIZE, num_entries // 2, num_entries - PAGE_SIZE // 2):
+        ids = [e["id"] for e in manager.list_entries(limit=PAGE_SIZE, skip=skip)]
+        assert ids == [e["id"] for e in exact[skip:skip + PAGE_SIZE]]
+
+    # since/until restrict the page to a date range
+    since = datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=100)
+    until = since + datetime.timedelta(minutes=50)
+    ranged = manager.list_entries(limit=PAGE_SIZE * 10, since=since, until=until)
+    assert [e["input"] for e in ranged] == [f"topic {i}" for i in range(149, 99, -1)]
+
+    # --- LAZY get_entry ---
+    assert collection.find_one_calls == 0, "listing should not fetch full entries"
+    target = exact[num_entries // 2]
+    full = manager.get_entry(target["id"])
+    assert collection.find_one_calls == 1
+    assert full["report"].startswith(f"report {num_entries - 1 - num_entries // 2} ")
+    assert full["chat_history"] and "_id" not in full
+    assert manager.get_entry("no-such-id") is None
+
+    print(f"{num_entries} entries: first page of {PAGE_SIZE} in {first_page_s * 1000:.1f}ms, "
+          f"{clicks} Load more click(s) to reach the end")
+    print("projection, newest-first order, limit+1 paging and lazy get_entry: OK")
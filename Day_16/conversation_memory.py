@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+RECENT_WINDOW = 6      # Messages (3 turns) always sent verbatim
+FOLD_BATCH = 4         # Overflow needed before a refresh, so the LLM isn't called every turn
+SUMMARY_WORDS = 250
+FOLD_MESSAGE_CHARS = 4000   # Long reports are cut to this before being summarized
+
+SUMMARY_PROMPT = """
+    You maintain the running memory of a research conversation.
+
+    CURRENT SUMMARY:
+    {summary}
+
+    NEW MESSAGES TO FOLD IN:
+    {transcript}
+
+    Rewrite the summary so it also covers the new messages. Keep the topics
+    researched, key findings, numbers, names, decisions and any preferences
+    the user stated. Drop pleasantries and formatting.
+    Answer with the updated summary only, in at most {words} words.
+    """
+
+
+def format_messages(messages, max_chars=None):
+    lines = []
+    for msg in messages:
+        content = msg["content"]
+        if max_chars is not None and len(content) > max_chars:
+            content = content[:max_chars] + "... [truncated]"
+        lines.append(f"{msg['role'].upper()}: {content}")
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=None)
+def _get_executor():
+    """Shared by every session; summaries are small, short LLM calls."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory")
+
+
+def _summarize(llm, summary, messages, summarized_count):
+    prompt = SUMMARY_PROMPT.format(
+        summary=summary or "(empty)",
+        transcript=format_messages(messages, FOLD_MESSAGE_CHARS),
+        words=SUMMARY_WORDS,
+    )
+    return llm.invoke(prompt).content.strip(), summarized_count
+
+
+class ConversationMemory:
+    """
+    Rolling summary of older messages plus a verbatim window of recent ones.
+    summarized_count is how many messages (from the start of the
+    transcript) the summary already covers. Once the window overflows by
+    FOLD_BATCH messages, the overflow is folded into the summary in a
+    background thread; collect() picks the result up on a later run.
+    """
+
+    def __init__(self, summary="", summarized_count=0):
+        self.summary = summary
+        self.summarized_count = summarized_count
+        self._pending = None   # Future of (summary, summarized_count)
+
+    def history_for_prompt(self, messages):
+        """Summary + every message it doesn't cover yet (at most RECENT_WINDOW + FOLD_BATCH)."""
+        parts = []
+        if self.summary:
+            parts.append(f"SUMMARY OF EARLIER CONVERSATION:\n{self.summary}")
+        recent = messages[self.summarized_count:]
+        if recent:
+            parts.append(format_messages(recent))
+        return "\n\n".join(parts)
+
+    def maybe_refresh(self, messages, llm):
+        """Starts a background refresh if the window has overflowed. Returns True if one started."""
+        if self._pending is not None:
+            return False
+        fold_until = len(messages) - RECENT_WINDOW
+        if fold_until - self.summarized_count < FOLD_BATCH:
+            return False
+        to_fold = list(messages[self.summarized_count:fold_until])
+        self._pending = _get_executor().submit(_summarize, llm, self.summary, to_fold, fold_until)
+        return True
+
+    def collect(self):
+        """Applies a finished refresh. Returns True when the summary changed (and should be saved)."""
+        if self._pending is None or not self._pending.done():
+            return False
+        future, self._pending = self._pending, None
+        try:
+            self.summary, self.summarized_count = future.result()
+        except Exception:
+            # Keep the old summary; the next turn retries with a larger overflow
+            return False
+        return True
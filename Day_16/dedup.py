@@ -0,0 +1,99 @@
+import hashlib
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track the click and never change the page
+TRACKING_PARAMS = frozenset({
+    "gclid", "fbclid", "msclkid", "dclid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref_src", "referrer", "spm", "_hsenc", "_hsmi", "cmpid",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_")
+
+SIMHASH_BITS = 64
+NEAR_DUPLICATE_DISTANCE = 10  # Max differing bits to count as copies (unrelated snippets differ by ~20+)
+MIN_WORDS_FOR_SIMHASH = 20    # Shorter snippets are too small to compare reliably
+
+WORD_RE = re.compile(r"\w+")
+
+
+def canonicalize_url(url):
+    """
+    Normalizes a URL so the same page found via different links compares
+    equal: https, no www., no default port, no tracking params or fragment,
+    sorted query and no trailing slash. Unparseable URLs (bad port,
+    None, ...) come back as the raw string, so one bad result can't fail
+    the turn.
+    """
+    raw = str(url or "")
+    try:
+        parts = urlsplit(raw.strip())
+        if not parts.netloc:
+            return raw
+        host = (parts.hostname or "").lower()
+        port = parts.port   # Raises ValueError on a malformed port
+    except ValueError:
+        return raw
+
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host
+    if port and port not in (80, 443):
+        netloc = f"{host}:{port}"
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    path = parts.path.rstrip("/") or ""
+    return urlunsplit(("https", netloc, path, urlencode(sorted(query)), ""))
+
+
+def simhash(text, bits=SIMHASH_BITS):
+    """SimHash over word 3-shingles; similar texts get fingerprints a few bits apart."""
+    words = WORD_RE.findall(text.lower())
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    weights = [0] * bits
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=bits // 8).digest(), "big")
+        for i in range(bits):
+            weights[i] += 1 if (h >> i) & 1 else -1
+    return sum(1 << i for i, w in enumerate(weights) if w > 0)
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def dedupe_sources(sources):
+    """
+    Drops sources whose canonical URL was already seen, then near-duplicate
+    contents (syndicated copies) by SimHash. Keeps the first occurrence.
+    Returns (kept sources, stats dict).
+    """
+    kept = []
+    seen_urls = set()
+    fingerprints = []
+    stats = {"url_duplicates": 0, "near_duplicates": 0, "removed": 0, "bytes_saved": 0}
+
+    for source in sources:
+        url = canonicalize_url(source.url)
+        if url in seen_urls:
+            stats["url_duplicates"] += 1
+            stats["bytes_saved"] += len(source.content.encode("utf-8"))
+            continue
+
+        fingerprint = None
+        if len(WORD_RE.findall(source.content)) >= MIN_WORDS_FOR_SIMHASH:
+            fingerprint = simhash(source.content)
+            if any(hamming_distance(fingerprint, f) <= NEAR_DUPLICATE_DISTANCE for f in fingerprints):
+                stats["near_duplicates"] += 1
+                stats["bytes_saved"] += len(source.content.encode("utf-8"))
+                continue
+
+        seen_urls.add(url)
+        if fingerprint is not None:
+            fingerprints.append(fingerprint)
+        kept.append(source)
+
+    stats["removed"] = stats["url_duplicates"] + stats["near_duplicates"]
+    return kept, stats
@@ -0,0 +1,39 @@
+from retrieval import tokenize
+
+MAX_FOLLOWUP_WORDS = 12   # Longer requests almost always carry a new question
+
+# Words that rework an earlier answer rather than ask for new facts
+FOLLOWUP_VERBS = frozenset("""
+summarize summarise summary recap tldr tl dr elaborate expand explain simplify rephrase rewrite
+reword shorten shorter simpler longer condense clarify continue translate more
+""".split())
+
+# Fillers and references back to the previous answer; never count as new content
+FOLLOWUP_FILLER = frozenset("""
+please can could would me tell give make go on about again above previous last your answer report
+response those these them that point points bullet bullets list briefly brief short simple plain
+terms words version detail details paragraph sentence sentences one two three
+""".split())
+
+
+def content_terms(text):
+    """Search terms of a request, without stopwords and follow-up phrasing."""
+    return [t for t in tokenize(text) if t not in FOLLOWUP_VERBS and t not in FOLLOWUP_FILLER]
+
+
+def is_followup(topic, chat_history):
+    """
+    True for requests that only rework the conversation so far ("summarize
+    that", "tell me more", "explain it simpler"), which need no new search.
+    Deliberately conservative: any content word that isn't already in the
+    conversation means the request goes through the planner.
+    """
+    if not chat_history or not chat_history.strip():
+        return False
+    if not topic.split() or len(topic.split()) > MAX_FOLLOWUP_WORDS:
+        return False
+
+    if not any(term in FOLLOWUP_VERBS for term in tokenize(topic)):
+        return False
+    known = set(tokenize(chat_history))
+    return all(term in known for term in content_terms(topic))
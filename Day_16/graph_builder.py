@@ -1,51 +1,113 @@
 import os
-from functools import partial
+from functools import partial, lru_cache
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from langchain_openai import ChatOpenAI  # <--- CHANGED FROM GOOGLE
 from tavily import TavilyClient
 
 # Import our separate modules
 from state import AgentState
-from planner_agent import planner_node
-from searcher_agent import searcher_node
+from planner_agent import planner_node, DEFAULT_NUM_QUERIES
+from searcher_agent import searcher_node, DEFAULT_MAX_CONCURRENCY, SEARCH_RETRY_POLICY
+from reranker_agent import reranker_node, DEFAULT_TOP_K
 from writer_agent import writer_node
+from search_cache import CachedSearchClient, get_search_cache
+from router_agent import router_node, ROUTE_SEARCH, ROUTE_FOLLOWUP, ROUTE_PDF, ROUTE_SOURCES
 
-def build_graph(openrouter_api_key, tavily_api_key):
+# We use "google/gemini-2.0-flash-001" as it is fast and powerful.
+# You can change this string to "openai/gpt-4o-mini" or others on OpenRouter.
+DEFAULT_MODEL = "google/gemini-2.0-flash-001"
+DEFAULT_TEMPERATURE = 0.5
+
+
+@lru_cache(maxsize=8)
+def get_llm(openrouter_api_key, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE):
     """
-    Initializes the LLM via OpenRouter and builds the graph.
+    Returns a shared ChatOpenAI client for these settings.
+    Reusing the instance keeps its HTTP connection pool (keep-alive) warm.
     """
-    
-    # 1. Setup OpenRouter LLM
-    # We use "google/gemini-2.0-flash-001" as it is fast and powerful.
-    # You can change this string to "openai/gpt-4o-mini" or others on OpenRouter.
-    llm = ChatOpenAI(
-        model="google/gemini-2.0-flash-001", 
+    return ChatOpenAI(
+        model=model,
         openai_api_key=openrouter_api_key,
         openai_api_base="https://openrouter.ai/api/v1",
-        temperature=0.5
+        temperature=temperature
     )
 
-    # 2. Setup Tavily
-    tavily = TavilyClient(api_key=tavily_api_key)
+
+@lru_cache(maxsize=8)
+def get_tavily_client(tavily_api_key):
+    """Returns a shared, cache-backed Tavily client for this key."""
+    return CachedSearchClient(TavilyClient(api_key=tavily_api_key), get_search_cache())
+
+
+def fan_out_searches(state):
+    """One searcher task per planned query; they all run in the same (parallel) step."""
+    queries = state.get('research_plan') or []
+    if not queries:
+        return "reranker"
+    refresh = state.get('refresh', False)
+    return [Send("searcher", {"query": q, "refresh": refresh}) for q in queries]
+
+
+def build_graph(openrouter_api_key, tavily_api_key, search_concurrency=DEFAULT_MAX_CONCURRENCY,
+                model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, rerank_top_k=DEFAULT_TOP_K,
+                num_queries=DEFAULT_NUM_QUERIES):
+    """
+    Initializes the LLM via OpenRouter and builds the graph.
+    search_concurrency caps how many graph tasks (in practice, Tavily
+    queries) run at the same time; rerank_top_k is how many sources reach
+    the writer; num_queries is how many searches the planner fans out.
+    """
+
+    # 1. Setup OpenRouter LLM
+    llm = get_llm(openrouter_api_key, model, temperature)
+
+    # 2. Setup Tavily (behind the persistent search cache)
+    tavily = get_tavily_client(tavily_api_key)
 
     # 3. Create Partial Functions
-    p_node = partial(planner_node, llm=llm)
+    p_node = partial(planner_node, llm=llm, num_queries=num_queries)
     s_node = partial(searcher_node, tavily_client=tavily)
+    r_node = partial(reranker_node, top_k=rerank_top_k)
     w_node = partial(writer_node, llm=llm)
 
     # 4. Build Graph
     workflow = StateGraph(AgentState)
 
     # Add Nodes
+    workflow.add_node("router", router_node)
     workflow.add_node("planner", p_node)
-    workflow.add_node("searcher", s_node)
+    workflow.add_node("searcher", s_node, retry_policy=SEARCH_RETRY_POLICY)   # Retries one query, not the step
+    workflow.add_node("reranker", r_node)
     workflow.add_node("writer", w_node)
 
     # Add Edges
-    workflow.set_entry_point("planner")
-    workflow.add_edge("planner", "searcher")
-    workflow.add_edge("searcher", "writer")
+    workflow.set_entry_point("router")
+    # Only the search route pays for the planner and Tavily
+    workflow.add_conditional_edges("router", lambda state: state["route"], {
+        ROUTE_SEARCH: "planner",
+        ROUTE_SOURCES: "reranker",
+        ROUTE_FOLLOWUP: "writer",
+        ROUTE_PDF: "writer",
+    })
+    # Fan-out: one searcher task per query; the reranker runs once they have all finished
+    workflow.add_conditional_edges("planner", fan_out_searches, ["searcher", "reranker"])
+    workflow.add_edge("searcher", "reranker")
+    workflow.add_edge("reranker", "writer")
     workflow.add_edge("writer", END)
 
-    # 5. Compile
-    return workflow.compile()
\ No newline at end of file
+    # 5. Compile (max_concurrency bounds the parallel searcher tasks)
+    return workflow.compile().with_config(max_concurrency=search_concurrency)
+
+
+@lru_cache(maxsize=8)
+def get_graph(openrouter_api_key, tavily_api_key, search_concurrency=DEFAULT_MAX_CONCURRENCY,
+              model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE, rerank_top_k=DEFAULT_TOP_K,
+              num_queries=DEFAULT_NUM_QUERIES):
+    """
+    Process-wide cached version of build_graph.
+    The compiled graph holds no per-request state, so every rerun and every
+    session with the same credentials and model settings can share it.
+    """
+    return build_graph(openrouter_api_key, tavily_api_key, search_concurrency, model, temperature, rerank_top_k,
+                       num_queries)
\ No newline at end of file
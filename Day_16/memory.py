@@ -4,6 +4,32 @@ import uuid
 import pymongo
 import certifi
 
+# Format used by older entries that stored the timestamp as a string
+LEGACY_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+
+def migrate_timestamps(collection):
+    """
+    Converts legacy string timestamps into native datetimes so they sort
+    and range-filter through the timestamp index. Safe to run repeatedly.
+    """
+    migrated = 0
+    for doc in collection.find({"timestamp": {"$type": "string"}}, {"_id": 1, "timestamp": 1}):
+        try:
+            parsed = datetime.datetime.strptime(doc["timestamp"], LEGACY_TIMESTAMP_FORMAT)
+        except ValueError:
+            continue
+        collection.update_one({"_id": doc["_id"]}, {"$set": {"timestamp": parsed}})
+        migrated += 1
+    return migrated
+
+def ensure_indexes(collection):
+    """Unique lookups/deletes by id, newest-first sorting and full-text search."""
+    collection.create_index([("id", pymongo.ASCENDING)], unique=True)
+    collection.create_index([("timestamp", pymongo.DESCENDING)])
+    collection.create_index([("session_id", pymongo.ASCENDING), ("timestamp", pymongo.ASCENDING)])
+    collection.create_index([("input", pymongo.TEXT), ("report", pymongo.TEXT)], weights={"input": 2})
+    collection.database["session_memory"].create_index([("session_id", pymongo.ASCENDING)], unique=True)
+
 # --- GLOBAL CACHED CONNECTION FUNCTION ---
 @st.cache_resource
 def get_mongo_collection():
@@ -28,12 +54,20 @@ def get_mongo_collection():
         client.server_info() 
         
         db = client["research_agent_db"]
-        return db["history"]
+        collection = db["history"]
+
+        # One-time setup per process (this function is cached)
+        migrate_timestamps(collection)
+        ensure_indexes(collection)
+        return collection
         
     except Exception as e:
         st.error(f"❌ Connection Failed: {e}")
         return None
 
+# Only the fields the sidebar needs to draw its list
+LISTING_PROJECTION = {"_id": 0, "id": 1, "session_id": 1, "timestamp": 1, "input": 1, "mode": 1, "settings": 1}
+
 class HistoryManager:
     def __init__(self):
         self.collection = get_mongo_collection()
@@ -51,18 +85,93 @@ class HistoryManager:
             st.error(f"Error loading history: {e}")
             return []
 
-    def save_entry(self, input_text, mode, final_report, messages):
-        """Saves a new research session to MongoDB."""
+    def list_entries(self, limit=20, skip=0, since=None, until=None):
+        """
+        Lightweight, newest-first page of history for the sidebar.
+        Only the LISTING_PROJECTION fields are fetched; use get_entry for the report.
+        since/until (datetimes) restrict the page to a date range.
+        """
+        if self.collection is None:
+            return []
+
+        query = {}
+        if since or until:
+            query["timestamp"] = {}
+            if since:
+                query["timestamp"]["$gte"] = since
+            if until:
+                query["timestamp"]["$lt"] = until
+
+        try:
+            cursor = (
+                self.collection.find(query, LISTING_PROJECTION)
+                .sort("timestamp", pymongo.DESCENDING)
+                .skip(skip)
+                .limit(limit)
+            )
+            return list(cursor)
+        except Exception as e:
+            st.error(f"Error loading history: {e}")
+            return []
+
+    def get_entry(self, entry_id):
+        """Fetches one full entry (report + chat history) by ID."""
+        if self.collection is None:
+            return None
+
+        try:
+            return self.collection.find_one({"id": entry_id}, {"_id": 0})
+        except Exception as e:
+            st.error(f"Error loading entry: {e}")
+            return None
+
+    def load_session(self, session_id):
+        """
+        Rebuilds a conversation transcript from its stored turns.
+        Older entries saved the whole transcript in chat_history; such an
+        entry's id doubles as its session id so it can still be resumed.
+        """
+        if self.collection is None:
+            return []
+
+        query = {"$or": [
+            {"session_id": session_id},
+            {"id": session_id, "session_id": {"$exists": False}},
+        ]}
+        try:
+            cursor = self.collection.find(
+                query, {"_id": 0, "input": 1, "report": 1, "chat_history": 1}
+            ).sort("timestamp", pymongo.ASCENDING)
+
+            messages = []
+            for turn in cursor:
+                if turn.get("chat_history"):
+                    messages = list(turn["chat_history"])
+                else:
+                    messages.append({"role": "user", "content": turn.get("input", "")})
+                    messages.append({"role": "assistant", "content": turn.get("report", "")})
+            return messages
+        except Exception as e:
+            st.error(f"Error loading session: {e}")
+            return []
+
+    def save_entry(self, input_text, mode, final_report, session_id, settings=None):
+        """
+        Appends one user/assistant turn of a conversation to MongoDB.
+        Only the new pair is written; load_session rebuilds the transcript.
+        settings records the options the report was written with.
+        """
         if self.collection is None:
             return None
 
         entry = {
             "id": str(uuid.uuid4()),
-            "timestamp": str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M")),
+            "session_id": session_id,
+            "timestamp": datetime.datetime.now(),
             "mode": mode,
             "input": input_text,
             "report": final_report,
-            "chat_history": messages
+            "settings": settings
         }
         
         try:
@@ -72,7 +181,64 @@ class HistoryManager:
             st.error(f"Error saving to DB: {e}")
             return None
 
+    def search(self, text, limit=20):
+        """Ranked full-text search over inputs and reports (MongoDB text index)."""
+        if self.collection is None or not text.strip():
+            return []
+
+        projection = dict(LISTING_PROJECTION, score={"$meta": "textScore"})
+        try:
+            cursor = (
+                self.collection.find({"$text": {"$search": text}}, projection)
+                .sort([("score", {"$meta": "textScore"})])
+                .limit(limit)
+            )
+            return list(cursor)
+        except Exception as e:
+            st.error(f"Search failed: {e}")
+            return []
+
+    def _summaries(self):
+        # Rolling conversation summaries live next to the history, one document per session
+        return self.collection.database["session_memory"]
+
+    def load_summary(self, session_id):
+        """Returns (summary, summarized_count) of a session's rolling memory, or None."""
+        if self.collection is None:
+            return None
+
+        try:
+            doc = self._summaries().find_one({"session_id": session_id}, {"_id": 0})
+        except Exception as e:
+            st.error(f"Error loading summary: {e}")
+            return None
+        return (doc["summary"], doc["summarized_count"]) if doc else None
+
+    def save_summary(self, session_id, summary, summarized_count):
+        """Stores (or replaces) a session's rolling memory."""
+        if self.collection is None:
+            return
+
+        try:
+            self._summaries().update_one(
+                {"session_id": session_id},
+                {"$set": {
+                    "summary": summary,
+                    "summarized_count": summarized_count,
+                    "updated_at": datetime.datetime.now(),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            st.error(f"Error saving summary: {e}")
+
     def delete_entry(self, entry_id):
-        """Deletes a specific entry by ID."""
+        """
+        Deletes a specific entry by ID. Its session's summary is dropped too,
+        since it counts messages that no longer exist; it is rebuilt on resume.
+        """
         if self.collection is not None:
+            entry = self.collection.find_one({"id": entry_id}, {"_id": 0, "session_id": 1})
+            if entry and entry.get("session_id"):
+                self._summaries().delete_one({"session_id": entry["session_id"]})
             self.collection.delete_one({"id": entry_id})
\ No newline at end of file
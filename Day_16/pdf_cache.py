@@ -0,0 +1,88 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+DEFAULT_CACHE_PATH = "pdf_cache.db"
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024   # Least recently used PDFs are evicted past this
+
+
+def hash_pdf(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class PdfTextCache:
+    """
+    On-disk (SQLite) cache of extracted PDF text, keyed by a SHA-256 of the
+    file's bytes. Holds per-page text plus metadata, with size-bounded
+    LRU eviction.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pdf_cache (
+                   hash TEXT PRIMARY KEY,
+                   pages TEXT NOT NULL,
+                   metadata TEXT NOT NULL,
+                   size INTEGER NOT NULL,
+                   last_access REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pdf_cache_access ON pdf_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, pdf_hash):
+        """Returns (pages, metadata) or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages, metadata FROM pdf_cache WHERE hash = ?", (pdf_hash,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pdf_cache SET last_access = ? WHERE hash = ?", (time.time(), pdf_hash))
+            self._conn.commit()
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put(self, pdf_hash, pages, metadata):
+        pages_json = json.dumps(pages)
+        size = len(pages_json)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdf_cache (hash, pages, metadata, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (pdf_hash, pages_json, json.dumps(metadata), size, time.time()),
+            )
+            # --- SIZE-BOUNDED LRU EVICTION ---
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pdf_cache").fetchone()[0]
+            if total > self.max_bytes:
+                for old_hash, old_size in self._conn.execute(
+                    "SELECT hash, size FROM pdf_cache WHERE hash != ? ORDER BY last_access ASC", (pdf_hash,)
+                ).fetchall():
+                    self._conn.execute("DELETE FROM pdf_cache WHERE hash = ?", (old_hash,))
+                    total -= old_size
+                    if total <= self.max_bytes:
+                        break
+            self._conn.commit()
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def get_pdf_cache(path=DEFAULT_CACHE_PATH):
+    """Process-wide cache instance, shared by every session."""
+    return PdfTextCache(path)
@@ -1,7 +1,37 @@
-def planner_node(state, llm):
+import hashlib
+import threading
+from collections import OrderedDict
+
+from prompt_budget import PLANNER_BUDGET_TOKENS, Section, estimate_tokens, fit_sections
+from search_cache import normalize_query
+
+PLAN_CACHE_SIZE = 256   # Most recent plans kept in memory, shared by every session
+DEFAULT_NUM_QUERIES = 3  # Each query becomes its own parallel search task
+
+_plan_cache = OrderedDict()
+_plan_lock = threading.Lock()
+
+
+def plan_cache_key(state, num_queries=DEFAULT_NUM_QUERIES):
+    """Normalized topic + digests of everything else the planner prompt depends on."""
+    def digest(text):
+        return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:16]
+
+    return (
+        normalize_query(state['topic']),
+        digest(state.get('chat_history', '')),
+        digest(state.get('pdf_digest', '')),
+        state.get('search_mode', 'General'),
+        num_queries,
+    )
+
+
+def build_planner_prompt(state, budget_tokens=PLANNER_BUDGET_TOKENS, num_queries=DEFAULT_NUM_QUERIES):
     topic = state['topic']
     history = state.get('chat_history', '') 
     search_mode = state.get('search_mode', 'General')
+    # The planner only sees the small digest, never the PDF text itself
+    pdf_digest = state.get('pdf_digest', '')
     
     # Define instructions based on mode
     if search_mode == "Academic Papers":
@@ -9,7 +39,10 @@ def planner_node(state, llm):
     else:
         mode_instruction = "Focus on general comprehensive information from the web."
 
-    prompt = f"""
+    pdf_section = f"REFERENCE DOCUMENT (digest of the user's uploaded PDF):\n    {pdf_digest}" if pdf_digest else ""
+
+    def render(topic, history, pdf_section):
+        return f"""
     You are a Research Planner.
     
     PREVIOUS CONVERSATION:
@@ -17,6 +50,7 @@ def planner_node(state, llm):
 
     CURRENT USER REQUEST: 
     {topic}
+    {pdf_section}
 
     # ==================================================
     # 🧠 LOGIC: CONTEXT AWARENESS vs. NEW TOPIC
@@ -34,13 +68,40 @@ def planner_node(state, llm):
     # ==================================================
     # TASK
     # ==================================================
-    Based on the logic above, generate 3 specific search queries.
+    Based on the logic above, generate {num_queries} specific search queries.
     {mode_instruction}
 
-    Constraint: Return ONLY the 3 queries separated by newlines. Do not number them.
+    Constraint: Return ONLY the {num_queries} queries separated by newlines. Do not number them.
     """
 
+    # --- TOKEN BUDGET ---
+    # Fixed instructions first, then the request, the PDF digest and finally
+    # as much of the (most recent) history as still fits.
+    overhead = estimate_tokens(render("", "", ""))
+    fitted = fit_sections(budget_tokens - overhead, [
+        Section("topic", topic, priority=0),
+        Section("pdf_section", pdf_section, priority=1),
+        Section("history", history, priority=2, keep="end"),
+    ])
+    return render(fitted["topic"], fitted["history"], fitted["pdf_section"])
+
+
+def planner_node(state, llm, num_queries=DEFAULT_NUM_QUERIES):
+    # --- PLAN CACHE ---
+    # The same request in the same context always gets the same queries,
+    # unless the user asked for a refresh
+    key = plan_cache_key(state, num_queries)
+    with _plan_lock:
+        if key in _plan_cache and not state.get('refresh'):
+            _plan_cache.move_to_end(key)
+            return {"research_plan": list(_plan_cache[key])}
+
+    prompt = build_planner_prompt(state, num_queries=num_queries)
     response = llm.invoke(prompt)
     queries = [q.strip() for q in response.content.split('\n') if q.strip()]
-    
-    return {"research_plan": queries[:3]}
\ No newline at end of file
+
+    with _plan_lock:
+        _plan_cache[key] = queries[:num_queries]
+        while len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    return {"research_plan": queries[:num_queries]}
\ No newline at end of file
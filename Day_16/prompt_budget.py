@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+
+try:
+    # Ships with langchain-openai; only used as a faster-than-LLM token count
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+CHARS_PER_TOKEN = 4   # Fallback estimate when tiktoken is unavailable
+
+# Prompt budgets per node (input tokens). Well under the model's context
+# window on purpose: they cap what each request costs.
+PLANNER_BUDGET_TOKENS = 6000
+WRITER_BUDGET_TOKENS = 24000
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text, max_tokens, keep="start", boundary=None):
+    """
+    Cuts text to about max_tokens, keeping its start (or end, for history).
+    With a boundary string (e.g. "\\n---"), the cut snaps back to the last
+    whole block instead of ending mid-block, when one fits.
+    """
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    if _ENCODING is not None:
+        tokens = _ENCODING.encode(text, disallowed_special=())
+        kept = tokens[:max_tokens] if keep == "start" else tokens[-max_tokens:]
+        cut = _ENCODING.decode(kept)
+    else:
+        chars = max_tokens * CHARS_PER_TOKEN
+        cut = text[:chars] if keep == "start" else text[-chars:]
+
+    if boundary:
+        if keep == "start":
+            pos = cut.rfind(boundary)
+            if pos > 0:
+                cut = cut[:pos + len(boundary)]
+        else:
+            pos = cut.find(boundary)
+            if 0 <= pos < len(cut) - len(boundary):
+                cut = cut[pos + len(boundary):]
+    return cut
+
+
+@dataclass
+class Section:
+    """One variable part of a prompt. Lower priority numbers are served first."""
+    name: str
+    text: str
+    priority: int
+    min_tokens: int = 0        # Reserved before lower priorities get anything
+    keep: str = "start"        # Which end survives truncation
+    boundary: str = None       # Preferred cut point (see truncate_tokens)
+
+
+def fit_sections(budget_tokens, sections):
+    """
+    Shares budget_tokens between sections by priority.
+    Pass 1 reserves each section's min_tokens (in priority order); pass 2
+    hands out what is left, again in priority order. Returns
+    {name: fitted text}.
+    """
+    needs = {s.name: estimate_tokens(s.text) for s in sections}
+    ordered = sorted(sections, key=lambda s: s.priority)
+    grants = {}
+    remaining = max(0, budget_tokens)
+
+    for s in ordered:
+        grant = min(needs[s.name], s.min_tokens, remaining)
+        grants[s.name] = grant
+        remaining -= grant
+
+    for s in ordered:
+        extra = min(needs[s.name] - grants[s.name], remaining)
+        grants[s.name] += extra
+        remaining -= extra
+
+    return {
+        s.name: s.text if grants[s.name] >= needs[s.name]
+        else truncate_tokens(s.text, grants[s.name], keep=s.keep, boundary=s.boundary)
+        for s in sections
+    }
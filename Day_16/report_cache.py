@@ -0,0 +1,220 @@
+import datetime
+import json
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from followup import content_terms
+from search_cache import normalize_query
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60   # "Latest on X" reports go stale after a day
+DEFAULT_THRESHOLD = 0.9              # Cosine similarity needed to reuse a report
+MIN_THRESHOLD = 0.88                 # Lowest the UI allows; different topics scored up to 0.875
+DEFAULT_MAX_ENTRIES = 2000           # Newest history inputs kept in the index
+VECTOR_DIM = 2048
+NGRAM = 3
+CACHEABLE_MODE = "Text"   # PDF answers depend on the uploaded file, so they are never reused
+
+# Measured on hand-written pairs: rewordings of one topic scored 0.90-1.0,
+# related but different topics 0.67-0.875 ("roman" vs "ottoman empire" 0.86,
+# "python 3.12" vs "3.13" 0.875). Changed numbers barely move the score
+# ("... outlook 2024" vs "2025" is 0.92), so a similarity hit must also have
+# the same topic_signature.
+NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def vectorize(text, dim=VECTOR_DIM):
+    """L2-normalized bag of hashed character 3-grams; ignores case and punctuation, mostly insensitive to word order."""
+    text = " " + re.sub(r"[\W_]+", " ", normalize_query(text)).strip() + " "
+    vec = np.zeros(dim, dtype=np.float32)
+    for i in range(len(text) - NGRAM + 1):
+        vec[zlib.crc32(text[i:i + NGRAM].encode("utf-8")) % dim] += 1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def topic_signature(text):
+    """Content words and numbers of a topic, ignoring order, case and filler words."""
+    terms = {t for t in content_terms(text) if len(t) > 1 or t.isdigit()}
+    numbers = set(NUMBER_RE.findall(normalize_query(text)))
+    return json.dumps([sorted(terms), sorted(numbers)])
+
+
+# Settings a reused report must match; other keys in an entry's settings are bookkeeping
+MATCH_SETTINGS = ("search_mode", "summary_length")
+
+
+def settings_key(settings):
+    settings = settings or {}
+    return json.dumps({name: settings.get(name) for name in MATCH_SETTINGS}, sort_keys=True)
+
+
+def is_indexable(entry):
+    """
+    Only first turns written by the pipeline are reusable: follow-ups depend
+    on their conversation, and copies served from the cache would restart
+    the freshness clock of the report they copy.
+    """
+    settings = entry.get("settings") or {}
+    return (
+        entry.get("mode") == CACHEABLE_MODE
+        and settings.get("first_turn")
+        and not settings.get("cached_from")
+        and _entry_time(entry) is not None
+    )
+
+
+def _entry_time(entry):
+    timestamp = entry.get("timestamp")
+    return timestamp.timestamp() if isinstance(timestamp, datetime.datetime) else None
+
+
+class ReportCache:
+    """
+    Reuses whole reports for repeated topics. Past history inputs are held
+    in memory as an exact-key dict (normalized topic + settings) and a
+    NumPy matrix of n-gram vectors for near-identical wording. Reports
+    themselves stay in the history backend and are fetched on a hit.
+    """
+
+    def __init__(self, history, ttl_seconds=DEFAULT_TTL_SECONDS, threshold=DEFAULT_THRESHOLD,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.history = history
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._exact = {}                 # (normalized topic, settings key) -> entry id
+        self._ids = []                   # Row i of the arrays below belongs to _ids[i]
+        self._settings = []
+        self._signatures = []
+        # Preallocated and grown by doubling; only the first len(_ids) rows are live
+        self._created = np.zeros(0)
+        self._matrix = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+
+    def _ensure_loaded(self):
+        # Built lazily from the newest fresh history entries (lock held), in one allocation
+        if self._loaded:
+            return
+        self._loaded = True
+        since = datetime.datetime.now() - datetime.timedelta(seconds=self.ttl_seconds)
+        entries = [e for e in reversed(self.history.list_entries(limit=self.max_entries, since=since))
+                   if is_indexable(e)]
+        self._ids = [e["id"] for e in entries]
+        self._settings = [settings_key(e["settings"]) for e in entries]
+        self._signatures = [topic_signature(e["input"]) for e in entries]
+        self._created = np.array([_entry_time(e) for e in entries], dtype=np.float64)
+        self._matrix = (np.vstack([vectorize(e["input"]) for e in entries]) if entries
+                        else np.zeros((0, VECTOR_DIM), dtype=np.float32))
+        for entry, key in zip(entries, self._settings):
+            self._exact[(normalize_query(entry["input"]), key)] = entry["id"]
+
+    def _append(self, entry):
+        if not is_indexable(entry):
+            return
+        # --- SIZE BOUND (oldest row goes first) ---
+        if len(self._ids) >= self.max_entries:
+            dropped = self._ids.pop(0)
+            self._settings.pop(0)
+            self._signatures.pop(0)
+            self._exact = {k: v for k, v in self._exact.items() if v != dropped}
+            n = len(self._ids)
+            self._created[:n] = self._created[1:n + 1]
+            self._matrix[:n] = self._matrix[1:n + 1]
+
+        row = len(self._ids)
+        if row >= len(self._created):
+            capacity = max(64, 2 * len(self._created))
+            created = np.zeros(capacity)
+            created[:row] = self._created[:row]
+            matrix = np.zeros((capacity, VECTOR_DIM), dtype=np.float32)
+            matrix[:row] = self._matrix[:row]
+            self._created, self._matrix = created, matrix
+
+        key = settings_key(entry["settings"])
+        self._exact[(normalize_query(entry["input"]), key)] = entry["id"]
+        self._ids.append(entry["id"])
+        self._settings.append(key)
+        self._signatures.append(topic_signature(entry["input"]))
+        self._created[row] = _entry_time(entry)
+        self._matrix[row] = vectorize(entry["input"])
+
+    def add(self, entry):
+        """Indexes a freshly saved history entry (ignored unless is_indexable)."""
+        with self._lock:
+            self._ensure_loaded()
+            self._append(entry)
+
+    def _find(self, topic, key, threshold, now):
+        """Returns (entry id, similarity, created) of the best fresh match, or None (lock held)."""
+        n = len(self._ids)
+        fresh = self._created[:n] >= now - self.ttl_seconds
+        entry_id = self._exact.get((normalize_query(topic), key))
+        if entry_id is not None:
+            row = self._ids.index(entry_id)
+            if fresh[row]:
+                return entry_id, 1.0, self._created[row]
+        if not self._ids:
+            return None
+
+        # Near-identical wording only counts with the same content words and numbers
+        mask = (fresh & (np.array(self._settings) == key)
+                & (np.array(self._signatures) == topic_signature(topic)))
+        if not mask.any():
+            return None
+        similarities = np.where(mask, self._matrix[:n] @ vectorize(topic), -1.0)
+        best = int(np.argmax(similarities))
+        if similarities[best] < threshold:
+            return None
+        return self._ids[best], float(similarities[best]), self._created[best]
+
+    def lookup(self, topic, settings, threshold=None):
+        """
+        Returns {"id", "report", "input", "similarity", "age_s"} for a fresh past
+        report on the same topic with the same settings, or None.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        key = settings_key(settings)
+        now = time.time()
+        with self._lock:
+            self._ensure_loaded()
+            match = self._find(topic, key, threshold, now)
+        entry = self.history.get_entry(match[0]) if match else None
+
+        if not entry or not entry.get("report"):
+            if match:
+                self._forget(match[0])   # Deleted from history since it was indexed
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return {
+            "id": match[0],
+            "report": entry["report"],
+            "input": entry["input"],
+            "similarity": match[1],
+            "age_s": now - match[2],
+        }
+
+    def _forget(self, entry_id):
+        with self._lock:
+            if entry_id in self._ids:
+                self._created[self._ids.index(entry_id)] = 0.0   # Treated as expired from now on
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "indexed": len(self._ids),
+            }
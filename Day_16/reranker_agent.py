@@ -0,0 +1,40 @@
+from dataclasses import replace
+
+from retrieval import BM25Index
+from dedup import dedupe_sources
+from writer_agent import needs_map_reduce
+
+DEFAULT_TOP_K = 8                  # Sources passed on to the writer
+DEFAULT_MAX_CHARS_PER_SOURCE = 3000
+
+
+def reranker_node(state, top_k=DEFAULT_TOP_K, max_chars_per_source=DEFAULT_MAX_CHARS_PER_SOURCE):
+    """
+    Merge step after the parallel searches: drops duplicates, ranks all
+    sources (across every query) by BM25 relevance to the request and
+    keeps the best top_k, each capped at max_chars_per_source. When the
+    uncapped top_k are big enough for the writer's map-reduce step, they
+    are passed on whole instead, so the map step condenses the full text.
+    The planner's queries are added to the topic so short follow-ups
+    ("tell me more") still rank against what is actually being researched.
+    """
+    # --- DEDUP ---
+    # The planner's queries often surface the same article or syndicated copies
+    sources, dedup_stats = dedupe_sources(state.get('search_results', []))
+    if not sources:
+        return {"sources": [], "dedup_stats": dedup_stats}
+
+    query = " ".join([state['topic'], *state.get('research_plan', [])])
+    index = BM25Index([f"{s.title}\n{s.content}" for s in sources])
+    bm25 = dict(index.search(query, top_k=len(sources)))
+
+    # Tavily's own score breaks ties (e.g. when nothing matches lexically)
+    order = sorted(
+        range(len(sources)),
+        key=lambda i: (bm25.get(i, 0.0), sources[i].score or 0.0),
+        reverse=True,
+    )
+    ranked = [sources[i] for i in order[:top_k]]
+    if not needs_map_reduce(dict(state, sources=ranked)):
+        ranked = [replace(s, content=s.content[:max_chars_per_source]) for s in ranked]
+    return {"sources": ranked, "dedup_stats": dedup_stats}
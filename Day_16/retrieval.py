@@ -0,0 +1,175 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+CHUNK_CHARS = 1200      # Target chunk size (roughly 300 tokens)
+DEFAULT_TOP_K = 6
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i in into is it its of on or
+that the their this to was were what when which who why will with you your
+""".split())
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_pages(pages, chunk_chars=CHUNK_CHARS):
+    """
+    Splits page texts into paragraph-aligned chunks of about chunk_chars.
+    Each chunk remembers the (1-based) page it starts on.
+    """
+    chunks = []
+    for page_no, page_text in enumerate(pages, start=1):
+        current = []
+        size = 0
+        for para in re.split(r"\n\s*\n", page_text):
+            para = para.strip()
+            if not para:
+                continue
+            # Very long paragraphs (common in extracted PDFs) are cut hard
+            while len(para) > chunk_chars:
+                if current:
+                    chunks.append({"page": page_no, "text": "\n".join(current)})
+                    current, size = [], 0
+                chunks.append({"page": page_no, "text": para[:chunk_chars]})
+                para = para[chunk_chars:]
+            if size + len(para) > chunk_chars and current:
+                chunks.append({"page": page_no, "text": "\n".join(current)})
+                current, size = [], 0
+            current.append(para)
+            size += len(para) + 1
+        if current:
+            chunks.append({"page": page_no, "text": "\n".join(current)})
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a list of texts, using an inverted index so a query only touches matching chunks."""
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = []
+        self.postings = defaultdict(list)   # term -> [(doc index, term frequency)]
+        for i, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((i, tf))
+
+        n = len(self.doc_lengths)
+        self.avg_length = (sum(self.doc_lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query, top_k=DEFAULT_TOP_K):
+        """Returns [(doc index, score)] for the best top_k matches, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc] / (self.avg_length or 1))
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+def build_pdf_index(pages, chunk_chars=CHUNK_CHARS):
+    """Chunks a document and indexes it; done once at upload time."""
+    chunks = chunk_pages(pages, chunk_chars)
+    return {"chunks": chunks, "index": BM25Index([c["text"] for c in chunks])}
+
+
+def retrieve_pdf_context(pdf_index, query, top_k=DEFAULT_TOP_K):
+    """
+    Returns the chunks most relevant to query as prompt text, in document order.
+    The first chunk (title/abstract) is always included so broad requests
+    like "summarize this paper" still have an anchor.
+    """
+    chunks = pdf_index["chunks"]
+    if not chunks:
+        return ""
+    selected = {doc for doc, _ in pdf_index["index"].search(query, top_k)}
+    selected.add(0)
+    return "\n\n".join(f"[Page {chunks[i]['page']}]\n{chunks[i]['text']}" for i in sorted(selected))
+
+
+# --- PLANNER DIGEST ---
+SECTION_WORDS = (
+    "abstract", "introduction", "background", "related work", "method", "methods", "methodology",
+    "approach", "experiments", "experimental setup", "evaluation", "results", "discussion",
+    "limitations", "future work", "conclusion", "conclusions", "references", "appendix",
+)
+NUMBERED_HEADING_RE = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+[A-Z][^\n]{2,80}$")
+MAX_HEADINGS = 25
+MAX_KEY_TERMS = 15
+
+
+def _find_headings(pages):
+    headings = []
+    for page in pages:
+        for line in page.splitlines():
+            line = line.strip()
+            if not line or len(line) > 90:
+                continue
+            if NUMBERED_HEADING_RE.match(line) or line.lower().rstrip(":") in SECTION_WORDS:
+                if line not in headings:
+                    headings.append(line)
+                if len(headings) >= MAX_HEADINGS:
+                    return headings
+    return headings
+
+
+def _find_abstract(pages, max_chars=1200):
+    opening = "\n".join(pages[:2])
+    match = re.search(r"\babstract\b[\s.:—-]*", opening, re.IGNORECASE)
+    if match:
+        text = opening[match.end():]
+        end = re.search(r"\n\s*(?:1\.?|I\.)?\s*introduction\b", text, re.IGNORECASE)
+        if end:
+            text = text[:end.start()]
+    else:
+        text = pages[0] if pages else ""
+    return " ".join(text.split())[:max_chars]
+
+
+def _key_terms(pages):
+    """Terms frequent in the document but not spread evenly over every page (tf-idf over pages)."""
+    tf = Counter()
+    df = Counter()
+    for page in pages:
+        terms = [t for t in tokenize(page) if len(t) > 3 and not t.isdigit()]
+        tf.update(terms)
+        df.update(set(terms))
+    n = len(pages) or 1
+    scored = {term: count * math.log(1 + n / df[term]) for term, count in tf.items() if count > 1}
+    return [term for term, _ in sorted(scored.items(), key=lambda item: item[1], reverse=True)[:MAX_KEY_TERMS]]
+
+
+def build_pdf_digest(pages, metadata=None):
+    """
+    Compact, fixed-size summary of a document for the planner: title,
+    abstract, section headings and key terms. Computed once at upload.
+    """
+    metadata = metadata or {}
+    title = metadata.get("title") or next(
+        (line.strip() for page in pages[:1] for line in page.splitlines() if line.strip()), ""
+    )
+    parts = [f"Title: {title[:200]}"]
+    abstract = _find_abstract(pages)
+    if abstract:
+        parts.append(f"Abstract: {abstract}")
+    headings = _find_headings(pages)
+    if headings:
+        parts.append("Sections: " + "; ".join(headings))
+    terms = _key_terms(pages)
+    if terms:
+        parts.append("Key terms: " + ", ".join(terms))
+    return "\n".join(parts)
@@ -0,0 +1,60 @@
+from followup import content_terms, is_followup
+from retrieval import tokenize
+
+# Routes and the node each one continues to (see graph_builder.build_graph)
+ROUTE_SEARCH = "search"        # Planner -> searcher -> reranker -> writer
+ROUTE_FOLLOWUP = "followup"    # Writer only: reworks the previous answer
+ROUTE_PDF = "pdf"              # Writer only: the retrieved PDF excerpts answer it
+ROUTE_SOURCES = "sources"      # Reranker -> writer over the previous turn's sources
+
+# A request counts as being about the uploaded document when it says so
+DOCUMENT_WORDS = frozenset("""
+paper document pdf article study report thesis authors author section chapter figure table
+appendix abstract introduction conclusion conclusions methodology results
+""".split())
+
+PDF_COVERAGE = 0.75      # Share of the request's terms that must appear in the PDF excerpts
+SOURCE_COVERAGE = 1.0    # Every term must appear in the previous sources to reuse them
+
+
+def coverage(terms, text):
+    """Share of terms found in text (1.0 when there are no terms to look for)."""
+    if not terms:
+        return 1.0
+    known = set(tokenize(text))
+    return sum(term in known for term in terms) / len(terms)
+
+
+def route(state):
+    """Returns (route, reason) for the request in state; cheap, local, no LLM call."""
+    topic = state['topic']
+    if is_followup(topic, state.get('chat_history', '')):
+        return ROUTE_FOLLOWUP, "reworks the previous answer"
+
+    terms = content_terms(topic)
+    pdf_context = state.get('pdf_context', '')
+    if pdf_context and DOCUMENT_WORDS.intersection(terms):
+        pdf_terms = [t for t in terms if t not in DOCUMENT_WORDS]
+        if coverage(pdf_terms, pdf_context) >= PDF_COVERAGE:
+            return ROUTE_PDF, "answered by the uploaded document"
+
+    prior_sources = state.get('prior_sources') or []
+    if prior_sources and terms:
+        source_text = "\n".join(f"{s.title}\n{s.content}" for s in prior_sources)
+        if coverage(terms, source_text) >= SOURCE_COVERAGE:
+            return ROUTE_SOURCES, "covered by the previous turn's sources"
+
+    return ROUTE_SEARCH, "needs a new web search"
+
+
+def router_node(state):
+    """
+    Decides whether this turn needs a web search. The decision is recorded
+    in state["route"]; for ROUTE_SOURCES the previous sources are handed
+    to the reranker as this turn's search results.
+    """
+    decision, reason = route(state)
+    update = {"route": decision, "route_reason": reason}
+    if decision == ROUTE_SOURCES:
+        update["search_results"] = list(state['prior_sources'])
+    return update
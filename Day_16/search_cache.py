@@ -0,0 +1,136 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+DEFAULT_CACHE_PATH = "search_cache.db"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60   # Search results go stale after a day
+DEFAULT_MAX_ENTRIES = 2000           # Oldest-used rows are evicted past this
+
+
+def normalize_query(query):
+    """Lowercases and collapses whitespace so trivially different queries share a key."""
+    query = re.sub(r"\s+", " ", str(query).lower()).strip()
+    return query.strip(" .?!")
+
+
+class SearchCache:
+    """
+    On-disk (SQLite) cache of Tavily responses with a TTL and LRU eviction.
+    Survives Streamlit restarts and is safe to share between searcher threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0   # Estimated latency avoided by hits
+        self._miss_seconds = 0.0   # Total time spent on real searches
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS search_cache (
+                   key TEXT PRIMARY KEY,
+                   response TEXT NOT NULL,
+                   created_at REAL NOT NULL,
+                   last_access REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(query, max_results, search_depth, **extra):
+        return json.dumps([normalize_query(query), max_results, search_depth, extra], sort_keys=True)
+
+    def get(self, key):
+        """Returns the cached response, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), now, now),
+            )
+            # --- LRU EVICTION ---
+            count = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM search_cache WHERE key IN "
+                    "(SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+            if self.misses:
+                self.saved_seconds += self._miss_seconds / self.misses
+
+    def record_miss(self, elapsed):
+        with self._lock:
+            self.misses += 1
+            self._miss_seconds += elapsed
+
+    def stats(self):
+        """Hit/miss counters for the UI (counts are per process)."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 2),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cache")
+            self._conn.commit()
+
+
+class CachedSearchClient:
+    """Drop-in wrapper around TavilyClient that consults a SearchCache first."""
+
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+
+    def search(self, query, max_results=5, search_depth="basic", refresh=False, **kwargs):
+        """refresh=True skips the cached response but still stores the new one."""
+        key = self.cache.make_key(query, max_results, search_depth, **kwargs)
+        cached = None if refresh else self.cache.get(key)
+        if cached is not None:
+            self.cache.record_hit()
+            return cached
+
+        start = time.perf_counter()
+        response = self.client.search(query=query, max_results=max_results, search_depth=search_depth, **kwargs)
+        self.cache.record_miss(time.perf_counter() - start)
+        self.cache.put(key, response)
+        return response
+
+
+@lru_cache(maxsize=None)
+def get_search_cache(path=DEFAULT_CACHE_PATH):
+    """Process-wide cache instance, so counters add up across graph builds."""
+    return SearchCache(path)
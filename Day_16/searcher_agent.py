@@ -1,25 +1,64 @@
-def searcher_node(state, tavily_client):
+import time
+
+import requests
+from langgraph.types import RetryPolicy
+from tavily.errors import TimeoutError as TavilyTimeoutError
+
+from state import Source
+
+# Max number of Tavily requests in flight at once (the graph's max_concurrency)
+DEFAULT_MAX_CONCURRENCY = 5
+SEARCH_ATTEMPTS = 3      # Tries per query for transient errors (timeouts, 5xx, dropped connections)
+
+
+def is_transient(error):
+    """Errors worth retrying. Auth, quota and bad-request errors fail at once."""
+    if isinstance(error, (TavilyTimeoutError, requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return False
+
+
+# LangGraph re-runs the same task on retry; the policy is attached in graph_builder
+SEARCH_RETRY_POLICY = RetryPolicy(max_attempts=SEARCH_ATTEMPTS, retry_on=is_transient)
+
+def _run_query(q, tavily_client, refresh=False):
+    """Runs one search query and returns its sources. Errors propagate."""
+    # We fetch a bit more context to ensure we get good summaries
+    response = tavily_client.search(query=q, max_results=2, search_depth="basic", refresh=refresh)
+    retrieved_at = time.time()
+    return [
+        Source(
+            # Tavily can send null fields; "or" also covers those
+            title=r.get('title') or 'Unknown Source',
+            url=r.get('url') or '#',
+            content=r.get('content') or '',
+            score=r.get('score'),
+            query=q,
+            retrieved_at=retrieved_at,
+        )
+        for r in response.get('results', [])
+    ]
+
+
+def searcher_node(state, runtime, tavily_client):
     """
-    Executes the search plan and extracts Titles and URLs for citations.
+    Runs ONE planned query (state is {"query": ...}, sent by
+    graph_builder.fan_out_searches) and extracts Titles and URLs for
+    citations. Every query is its own task, so they run in parallel.
+    Transient errors are raised so SEARCH_RETRY_POLICY retries just this
+    query; the last failure (or any non-transient one) is returned in
+    search_errors rather than failing the whole run.
+    Results are appended to search_results by the reducer on AgentState.
     """
-    queries = state['research_plan']
-    results = []
-
-    for q in queries:
-        try:
-            # We fetch a bit more context to ensure we get good summaries
-            response = tavily_client.search(query=q, max_results=2, search_depth="basic")
-            
-            for r in response.get('results', []):
-                title = r.get('title', 'Unknown Source')
-                url = r.get('url', '#')
-                content = r.get('content', '')
-                
-                # Format specifically so the Writer sees the URL
-                results.append(f"Title: {title}\nURL: {url}\nContent: {content}\n---")
-                
-        except Exception as e:
-            results.append(f"Error searching {q}: {e}")
-
-    combined_content = "\n".join(results)
-    return {"search_results": combined_content}
\ No newline at end of file
+    query = state['query']
+    # LangGraph numbers the attempts of this task (1 on the first run)
+    attempt = runtime.execution_info.node_attempt
+    try:
+        sources = _run_query(query, tavily_client, state.get('refresh', False))
+    except Exception as e:
+        if is_transient(e) and attempt < SEARCH_RETRY_POLICY.max_attempts:
+            raise
+        return {"search_results": [], "search_errors": [f"Error searching {query}: {e}"]}
+    return {"search_results": sources, "search_errors": []}
\ No newline at end of file
@@ -0,0 +1,229 @@
+import streamlit as st
+import datetime
+import json
+import sqlite3
+import threading
+import uuid
+
+DEFAULT_DB_PATH = "research_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    session_id TEXT,
+    timestamp TEXT NOT NULL,
+    mode TEXT,
+    input TEXT NOT NULL,
+    report TEXT NOT NULL,
+    settings TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_history_session ON history(session_id, timestamp);
+CREATE TABLE IF NOT EXISTS session_memory (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    summarized_count INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+# External-content FTS5 table kept in sync with `history` by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+    input, report, content='history', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, input, report) VALUES (new.rowid, new.input, new.report);
+END;
+CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, input, report) VALUES ('delete', old.rowid, old.input, old.report);
+END;
+"""
+
+LISTING_COLUMNS = "id, session_id, timestamp, input, mode, settings"
+
+
+# --- GLOBAL CACHED CONNECTION FUNCTION ---
+@st.cache_resource
+def get_sqlite_connection(path=DEFAULT_DB_PATH):
+    """
+    One shared connection per process. Returns (connection, lock, has_fts)
+    because not every SQLite build ships with FTS5.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    # Databases created before the report cache lack the settings column
+    if "settings" not in {row["name"] for row in conn.execute("PRAGMA table_info(history)")}:
+        conn.execute("ALTER TABLE history ADD COLUMN settings TEXT")
+    try:
+        conn.executescript(FTS_SCHEMA)
+        has_fts = True
+    except sqlite3.OperationalError:
+        has_fts = False
+    conn.commit()
+    return conn, threading.Lock(), has_fts
+
+
+def _to_entry(row):
+    entry = dict(row)
+    if "timestamp" in entry:
+        entry["timestamp"] = datetime.datetime.fromisoformat(entry["timestamp"])
+    if entry.get("settings"):
+        entry["settings"] = json.loads(entry["settings"])
+    return entry
+
+
+def _fts_query(text):
+    """Turns free text into an FTS5 query: every word must match, the last one as a prefix."""
+    words = [w.replace('"', '""') for w in text.split()]
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SQLiteHistoryManager:
+    """
+    Local history backend with the same interface as memory.HistoryManager,
+    plus ranked full-text search over past inputs and reports.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.conn, self.lock, self.has_fts = get_sqlite_connection(path)
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def load_history(self):
+        """Loads all history entries, oldest first."""
+        rows = self._query(f"SELECT {LISTING_COLUMNS}, report FROM history ORDER BY timestamp ASC")
+        return [_to_entry(r) for r in rows]
+
+    def list_entries(self, limit=20, skip=0, since=None, until=None):
+        """Lightweight, newest-first page of history for the sidebar."""
+        where, params = [], []
+        if since:
+            where.append("timestamp >= ?")
+            params.append(since.isoformat())
+        if until:
+            where.append("timestamp < ?")
+            params.append(until.isoformat())
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        rows = self._query(
+            f"SELECT {LISTING_COLUMNS} FROM history {clause} ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+            (*params, limit, skip),
+        )
+        return [_to_entry(r) for r in rows]
+
+    def get_entry(self, entry_id):
+        """Fetches one full entry by ID."""
+        rows = self._query(f"SELECT {LISTING_COLUMNS}, report FROM history WHERE id = ?", (entry_id,))
+        return _to_entry(rows[0]) if rows else None
+
+    def load_session(self, session_id):
+        """Rebuilds a conversation transcript from its stored turns."""
+        rows = self._query(
+            "SELECT input, report FROM history WHERE session_id = ? OR (session_id IS NULL AND id = ?) "
+            "ORDER BY timestamp ASC",
+            (session_id, session_id),
+        )
+        messages = []
+        for row in rows:
+            messages.append({"role": "user", "content": row["input"]})
+            messages.append({"role": "assistant", "content": row["report"]})
+        return messages
+
+    def save_entry(self, input_text, mode, final_report, session_id, settings=None):
+        """
+        Appends one user/assistant turn of a conversation. settings records
+        the options the report was written with (search mode, length).
+        """
+        entry = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "timestamp": datetime.datetime.now(),
+            "mode": mode,
+            "input": input_text,
+            "report": final_report,
+            "settings": settings
+        }
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT INTO history (id, session_id, timestamp, mode, input, report, settings) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (entry["id"], session_id, entry["timestamp"].isoformat(), mode, input_text, final_report,
+                     json.dumps(settings) if settings else None),
+                )
+            return entry
+        except sqlite3.Error as e:
+            st.error(f"Error saving to DB: {e}")
+            return None
+
+    def load_summary(self, session_id):
+        """Returns (summary, summarized_count) of a session's rolling memory, or None."""
+        rows = self._query(
+            "SELECT summary, summarized_count FROM session_memory WHERE session_id = ?", (session_id,)
+        )
+        return (rows[0]["summary"], rows[0]["summarized_count"]) if rows else None
+
+    def save_summary(self, session_id, summary, summarized_count):
+        """Stores (or replaces) a session's rolling memory."""
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO session_memory (session_id, summary, summarized_count, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (session_id, summary, summarized_count, datetime.datetime.now().isoformat()),
+                )
+        except sqlite3.Error as e:
+            st.error(f"Error saving summary: {e}")
+
+    def delete_entry(self, entry_id):
+        """
+        Deletes a specific entry by ID. Its session's summary is dropped too,
+        since it counts messages that no longer exist; it is rebuilt on resume.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM session_memory WHERE session_id = (SELECT session_id FROM history WHERE id = ?)",
+                (entry_id,),
+            )
+            self.conn.execute("DELETE FROM history WHERE id = ?", (entry_id,))
+
+    def search(self, text, limit=20):
+        """
+        Ranked full-text search over inputs and reports (BM25, inputs weighted
+        higher). Each result carries a short highlighted 'snippet'.
+        """
+        match = _fts_query(text)
+        if match is None:
+            return []
+
+        if not self.has_fts:
+            # Plain substring fallback when SQLite was built without FTS5
+            like = f"%{text.strip()}%"
+            rows = self._query(
+                f"SELECT {LISTING_COLUMNS}, substr(report, 1, 120) AS snippet FROM history "
+                "WHERE input LIKE ? OR report LIKE ? ORDER BY timestamp DESC LIMIT ?",
+                (like, like, limit),
+            )
+            return [_to_entry(r) for r in rows]
+
+        try:
+            rows = self._query(
+                "SELECT h.id, h.session_id, h.timestamp, h.input, h.mode, h.settings, "
+                "snippet(history_fts, 1, '**', '**', '…', 12) AS snippet "
+                "FROM history_fts JOIN history h ON h.rowid = history_fts.rowid "
+                "WHERE history_fts MATCH ? ORDER BY bm25(history_fts, 2.0, 1.0) LIMIT ?",
+                (match, limit),
+            )
+        except sqlite3.OperationalError as e:
+            st.error(f"Search failed: {e}")
+            return []
+        return [_to_entry(r) for r in rows]
@@ -1,10 +1,39 @@
-from typing import TypedDict, List
+import operator
+from dataclasses import dataclass
+from typing import Annotated, TypedDict, List, Optional
+
+
+@dataclass(slots=True)
+class Source:
+    """One search result, kept structured so it can be deduped, ranked and budgeted."""
+    title: str
+    url: str
+    content: str
+    score: Optional[float] = None   # Tavily's relevance score
+    query: str = ""                 # Planner query that found it
+    retrieved_at: float = 0.0       # Unix time of the search
+
+    def to_prompt(self, max_chars=None):
+        """Formats the source the way the Writer expects (so it sees the URL)."""
+        content = self.content if max_chars is None else self.content[:max_chars]
+        return f"Title: {self.title}\nURL: {self.url}\nContent: {content}\n---"
+
 
 class AgentState(TypedDict):
     topic: str                
+    pdf_context: str          # Retrieved PDF excerpts for the writer
+    pdf_digest: str           # Compact PDF summary for the planner
     chat_history: str         # <--- NEW FIELD (Previous conversation)
     summary_length: str       
     search_mode: str          
+    prior_sources: List[Source]   # Sources of the previous turn, for the router to reuse
+    refresh: bool             # Bypass the plan and search caches (fresh results are still cached)
+    route: str                # Router decision (see router_agent)
+    route_reason: str
     research_plan: List[str]  
-    search_results: str       
+    # Parallel searcher tasks each append their results (operator.add reducer)
+    search_results: Annotated[List[Source], operator.add]
+    search_errors: Annotated[List[str], operator.add]   # Queries that failed, with the error
+    sources: List[Source]     # Deduped and ranked results, for the writer
+    dedup_stats: dict         # Duplicates removed after search (counts, bytes saved)
     final_report: str         
\ No newline at end of file
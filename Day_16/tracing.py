@@ -0,0 +1,76 @@
+import json
+import time
+import uuid
+import datetime
+
+TIMING_LOG_PATH = "timing_log.jsonl"
+
+
+class NodeTimer:
+    """
+    Records when each graph node starts and ends during one request.
+    Tasks are keyed by LangGraph's task id so parallel runs of the same
+    node are timed separately.
+    """
+
+    def __init__(self, log_path=TIMING_LOG_PATH):
+        self.log_path = log_path
+        self.request_id = str(uuid.uuid4())
+        self.started_at = time.perf_counter()
+        self.nodes = []      # Finished steps, in completion order
+        self.metrics = {}    # Extra per-request numbers (e.g. time-to-first-token)
+        self._running = {}
+
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    def start(self, task_id, node):
+        self._running[task_id] = (node, time.perf_counter())
+
+    def end(self, task_id, error=None):
+        """Marks a task as finished and returns (node, duration in seconds)."""
+        node, start = self._running.pop(task_id, (None, None))
+        if node is None:
+            return None, 0.0
+        now = time.perf_counter()
+        duration = now - start
+        self.nodes.append({
+            "node": node,
+            "start_s": round(start - self.started_at, 3),
+            "end_s": round(now - self.started_at, 3),
+            "duration_s": round(duration, 3),
+            "error": error,
+        })
+        return node, duration
+
+    def record(self, key, value):
+        self.metrics[key] = value
+
+    def summary(self):
+        """
+        Latency breakdown for this request. A node's time is the wall-clock
+        span of its steps, so parallel tasks (the searches) aren't summed.
+        """
+        spans = {}
+        for step in self.nodes:
+            start, end = spans.get(step["node"], (step["start_s"], step["end_s"]))
+            spans[step["node"]] = (min(start, step["start_s"]), max(end, step["end_s"]))
+        breakdown = {node: round(end - start, 3) for node, (start, end) in spans.items()}
+        return {
+            "request_id": self.request_id,
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "total_s": round(self.elapsed(), 3),
+            "per_node_s": breakdown,
+            "steps": self.nodes,
+            **self.metrics,
+        }
+
+    def write_log(self):
+        """Appends the summary as one JSON line to the timing log."""
+        entry = self.summary()
+        try:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError:
+            pass
+        return entry
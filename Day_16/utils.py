@@ -1,9 +1,193 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import pypdf
 
-def extract_pdf_text(uploaded_file):
-    """Extracts text from a Streamlit UploadedFile object."""
+from pdf_cache import hash_pdf
+
+# The agent never sends more than this much PDF text to the model
+DEFAULT_CHAR_BUDGET = 100000
+CHARS_PER_TOKEN = 4   # Rough average for English text
+
+# Below this many pages, process start-up costs more than it saves
+PARALLEL_MIN_PAGES = 40
+MIN_PAGES_PER_TASK = 8
+
+
+def iter_pdf_pages(uploaded_file):
+    """Yields the text of each page lazily, one page at a time."""
     pdf_reader = pypdf.PdfReader(uploaded_file)
-    text = ""
     for page in pdf_reader.pages:
-        text += page.extract_text() + "\n"
-    return text
\ No newline at end of file
+        yield page.extract_text() or ""
+
+
+def _extract_page_range(pdf_bytes, start, end):
+    """Worker-process task: text of pages [start, end)."""
+    pdf_reader = pypdf.PdfReader(io.BytesIO(pdf_bytes))
+    return [pdf_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_process_pool(workers):
+    """
+    Long-lived pool so each upload doesn't pay for starting processes.
+    Workers are spawned, not forked: forking the multi-threaded Streamlit
+    server can deadlock a child on a lock held by another thread.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[workers] = pool
+        return pool
+
+
+def _discard_process_pool(workers):
+    """Drops a broken pool so the next upload starts a fresh one."""
+    with _pools_lock:
+        pool = _pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_serial(pdf_bytes, total_pages, max_chars, progress_callback):
+    pages, total = [], 0
+    for i, text in enumerate(iter_pdf_pages(io.BytesIO(pdf_bytes)), start=1):
+        pages.append(text)
+        total += len(text) + 1
+        if progress_callback:
+            progress_callback(i, total_pages)
+        if max_chars is not None and total >= max_chars:
+            break
+    return pages
+
+
+def _extract_parallel(pdf_bytes, total_pages, max_chars, progress_callback, workers):
+    # About two tasks per worker keeps every core busy without copying the
+    # PDF bytes to the pool too many times.
+    size = max(MIN_PAGES_PER_TASK, -(-total_pages // (workers * 2)))
+    ranges = [(start, min(start + size, total_pages)) for start in range(0, total_pages, size)]
+
+    pool = _get_process_pool(workers)
+    futures = [pool.submit(_extract_page_range, pdf_bytes, start, end) for start, end in ranges]
+
+    pages, total = [], 0
+    try:
+        # Collect in submission order so pages stay in document order
+        for future, (_, end) in zip(futures, ranges):
+            for text in future.result():
+                pages.append(text)
+                total += len(text) + 1
+            if progress_callback:
+                progress_callback(end, total_pages)
+            if max_chars is not None and total >= max_chars:
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+    return pages
+
+
+def _read_metadata(pdf_bytes):
+    pdf_reader = pypdf.PdfReader(io.BytesIO(pdf_bytes))
+    info = pdf_reader.metadata
+    return {
+        "num_pages": len(pdf_reader.pages),
+        "title": (info.title if info and info.title else "") or "",
+    }
+
+
+def _extract_pages(pdf_bytes, total_pages, max_chars, progress_callback, workers):
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and total_pages >= PARALLEL_MIN_PAGES:
+        try:
+            return _extract_parallel(pdf_bytes, total_pages, max_chars, progress_callback, workers)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory): rebuild the pool next time
+            _discard_process_pool(workers)
+        except Exception:
+            # e.g. process start-up not allowed on this host: fall back to serial
+            pass
+    return _extract_serial(pdf_bytes, total_pages, max_chars, progress_callback)
+
+
+def _read_bytes(uploaded_file):
+    return uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+
+
+def extract_pdf_pages(uploaded_file, max_chars=None, progress_callback=None, workers=None):
+    """
+    Returns the text of each page, in order.
+    Large PDFs are split into page ranges and extracted on a process pool;
+    small ones (or workers=1) are read serially. Reading stops once
+    max_chars is reached. progress_callback(pages_done, total_pages) is
+    called as pages come in.
+    """
+    pdf_bytes = _read_bytes(uploaded_file)
+    total_pages = _read_metadata(pdf_bytes)["num_pages"]
+    return _extract_pages(pdf_bytes, total_pages, max_chars, progress_callback, workers)
+
+
+def extract_pdf_document(uploaded_file, max_chars=DEFAULT_CHAR_BUDGET, max_tokens=None,
+                         progress_callback=None, workers=None, cache=None):
+    """
+    Like extract_pdf_text, but returns a dict with "text", "pages",
+    "metadata" and "cache_hit". When a PdfTextCache is given, the file's
+    bytes are hashed and a previous extraction of the same PDF is reused.
+    """
+    if max_tokens is not None:
+        token_chars = max_tokens * CHARS_PER_TOKEN
+        max_chars = token_chars if max_chars is None else min(max_chars, token_chars)
+
+    pdf_bytes = _read_bytes(uploaded_file)
+    pdf_hash = hash_pdf(pdf_bytes)
+
+    # --- CACHE LOOKUP ---
+    # A cached extraction is reusable if it covers the whole document or at
+    # least as many characters as this call asks for.
+    cached = cache.get(pdf_hash) if cache is not None else None
+    if cached is not None:
+        pages, metadata = cached
+        cached_chars = sum(len(p) + 1 for p in pages)
+        if metadata.get("complete") or (max_chars is not None and cached_chars >= max_chars):
+            cache.record(hit=True)
+            text = "\n".join(pages)
+            return {
+                "text": text if max_chars is None else text[:max_chars],
+                "pages": pages,
+                "metadata": metadata,
+                "cache_hit": True,
+            }
+
+    metadata = _read_metadata(pdf_bytes)
+    pages = _extract_pages(pdf_bytes, metadata["num_pages"], max_chars, progress_callback, workers)
+    metadata["complete"] = len(pages) == metadata["num_pages"]
+    metadata["sha256"] = pdf_hash
+    if cache is not None:
+        cache.record(hit=False)
+        cache.put(pdf_hash, pages, metadata)
+
+    text = "\n".join(pages)  # Joined once
+    return {
+        "text": text if max_chars is None else text[:max_chars],
+        "pages": pages,
+        "metadata": metadata,
+        "cache_hit": False,
+    }
+
+
+def extract_pdf_text(uploaded_file, max_chars=DEFAULT_CHAR_BUDGET, max_tokens=None,
+                     progress_callback=None, workers=None, cache=None):
+    """
+    Extracts text from a Streamlit UploadedFile object.
+    Stops reading pages once max_chars (or max_tokens) is reached;
+    pass max_chars=None for the whole document.
+    """
+    return extract_pdf_document(uploaded_file, max_chars, max_tokens, progress_callback, workers, cache)["text"]
\ No newline at end of file
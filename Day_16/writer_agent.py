@@ -1,6 +1,114 @@
-def writer_node(state, llm):
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+
+from prompt_budget import CHARS_PER_TOKEN, WRITER_BUDGET_TOKENS, Section, estimate_tokens, fit_sections
+from router_agent import ROUTE_FOLLOWUP, ROUTE_PDF
+
+FENCE_MARKERS = ("```markdown", "```")
+
+# --- WHEN THERE IS NO SEARCH DATA ---
+NO_SEARCH_NOTE = "(No new search was run for this request. Answer from the PREVIOUS CONVERSATION CONTEXT and the PDF content.)"
+SEARCH_FAILED_NOTE = (
+    "(The web search FAILED for this request: {errors}. Start by telling the user the search failed, "
+    "then answer only from the PREVIOUS CONVERSATION CONTEXT and the PDF content, if any. Do NOT invent sources.)"
+)
+NO_RESULTS_NOTE = "(The web search returned no results for this request. Say so, and do NOT invent sources.)"
+
+# --- MAP-REDUCE SETTINGS ---
+MAP_REDUCE_TOKEN_THRESHOLD = 12000  # Above this, sources are condensed before writing
+MAP_BATCH_TOKENS = 4000             # Source text per map call
+MAP_CONCURRENCY = 4                 # Map calls in flight at once
+MAP_TAG = "writer_map"              # Lets the UI skip map-step tokens when streaming
+HISTORY_FLOOR_TOKENS = 1000         # Recent history kept even when sources fill the budget
+
+
+def clean_report(text):
+    """Removes markdown code fences the model sometimes wraps the report in."""
+    for marker in FENCE_MARKERS:
+        text = text.replace(marker, '')
+    return text.strip()
+
+
+class FenceCleaner:
+    """
+    Streaming version of clean_report.
+    feed() returns the text that is safe to show now; anything that could
+    still turn into a fence (e.g. a trailing "``") or trailing whitespace is
+    held back until the next chunk or flush().
+    """
+
+    def __init__(self):
+        self._pending = ""      # Possible start of a fence
+        self._whitespace = ""   # Trailing whitespace, dropped if nothing follows
+        self._started = False   # Leading whitespace is dropped until real text arrives
+
+    def _held_suffix(self, text):
+        marker = FENCE_MARKERS[0]
+        for size in range(min(len(marker) - 1, len(text)), 0, -1):
+            if marker.startswith(text[-size:]):
+                return size
+        return 0
+
+    def _emit(self, text):
+        for marker in FENCE_MARKERS:
+            text = text.replace(marker, '')
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        text = self._whitespace + text
+        visible = text.rstrip()
+        self._whitespace = text[len(visible):]
+        return visible
+
+    def feed(self, chunk):
+        text = self._pending + chunk
+        hold = self._held_suffix(text)
+        self._pending = text[len(text) - hold:] if hold else ""
+        return self._emit(text[:len(text) - hold])
+
+    def flush(self):
+        text, self._pending = self._pending, ""
+        return self._emit(text)
+
+
+def format_sources(sources, max_chars=None):
+    """
+    Renders sources as prompt text, in order, stopping at max_chars.
+    The source that crosses the budget is cut rather than dropped.
+    """
+    blocks = []
+    used = 0
+    for source in sources:
+        block = source.to_prompt()
+        if max_chars is not None and used + len(block) > max_chars:
+            room = max_chars - used - len(source.to_prompt(0))
+            if room > 200:
+                blocks.append(source.to_prompt(room))
+            break
+        blocks.append(block)
+        used += len(block) + 1
+    return "\n".join(blocks)
+
+
+def missing_data_note(state):
+    """Tells the writer why there are no sources: skipped on purpose, failed, or simply empty."""
+    if state.get('route') in (ROUTE_FOLLOWUP, ROUTE_PDF):
+        return NO_SEARCH_NOTE
+    errors = state.get('search_errors') or []
+    if errors:
+        return SEARCH_FAILED_NOTE.format(errors="; ".join(e[:200] for e in errors))
+    return NO_RESULTS_NOTE
+
+
+def build_writer_prompt(state, data=None, budget_tokens=WRITER_BUDGET_TOKENS):
     topic = state['topic']
-    data = state['search_results']
+    if data is None:
+        # Formatted lazily here; fit_sections below trims it to the budget
+        data = format_sources(state.get('sources', []))
+    if not data:
+        data = missing_data_note(state)
+    pdf_context = state.get('pdf_context', '')
     # --- FIX 1: Access History ---
     history = state.get('chat_history', '') 
     
@@ -60,13 +168,17 @@ def writer_node(state, llm):
         citation_instruction = "Do NOT include a 'References' section. Do NOT include links."
 
     # --- 3. FINAL PROMPT ---
-    prompt = f"""
+    pdf_section = f"REFERENCE PDF CONTENT (most relevant excerpts):\n    {pdf_context}" if pdf_context else ""
+
+    def render(topic, history, pdf_section, data):
+        return f"""
     {role_desc}
     
     PREVIOUS CONVERSATION CONTEXT:
     {history}
 
     CURRENT USER INPUT: {topic}
+    {pdf_section}
     
     {structure}
     
@@ -84,9 +196,84 @@ def writer_node(state, llm):
     4. **CLEAN OUTPUT:** Do NOT wrap the output in code blocks.
     """
 
-    response = llm.invoke(prompt)
-    
-    # --- 4. CLEANUP ---
-    clean_content = response.content.replace('```markdown', '').replace('```', '').strip()
-    
-    return {"final_report": clean_content}
\ No newline at end of file
+    # --- TOKEN BUDGET ---
+    # Priority: instructions > request > a floor of recent history > PDF
+    # excerpts > sources (cut at whole sources) > the rest of the history.
+    overhead = estimate_tokens(render("", "", "", ""))
+    fitted = fit_sections(budget_tokens - overhead, [
+        Section("topic", topic, priority=0),
+        Section("pdf_section", pdf_section, priority=1),
+        Section("data", data, priority=2, boundary="\n---"),
+        Section("history", history, priority=3, min_tokens=HISTORY_FLOOR_TOKENS, keep="end"),
+    ])
+    return render(fitted["topic"], fitted["history"], fitted["pdf_section"], fitted["data"])
+
+
+def _batch_sources(sources, max_chars):
+    """Groups sources into prompt-text batches of about max_chars each."""
+    batches, current, size = [], [], 0
+    for source in sources:
+        block = source.to_prompt(max_chars)
+        if current and size + len(block) > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(block)
+        size += len(block)
+    if current:
+        batches.append(current)
+    return ["\n".join(batch) for batch in batches]
+
+
+def _map_sources(batch, topic, llm):
+    prompt = f"""
+    You are a Research Assistant condensing sources for a report on:
+    {topic}
+
+    From the sources below, extract every fact, figure and finding relevant to the topic
+    as concise bullet points. End each bullet with its source as a markdown link [Title](URL).
+    Skip anything irrelevant. Do NOT write an introduction or conclusion.
+
+    SOURCES:
+    {batch}
+    """
+    response = llm.invoke(prompt, config={"tags": [MAP_TAG]})
+    return response.content
+
+
+def condense_sources(state, llm, max_concurrency=MAP_CONCURRENCY):
+    """
+    Map step: summarizes source batches in parallel (bounded concurrency).
+    Returns the notes in the original source order, URLs kept inline so the
+    References section still has them. ContextThreadPoolExecutor carries the
+    node's callbacks into the worker threads, so the map calls are traced
+    and streamed (tagged MAP_TAG) like the writer's own call.
+    """
+    batches = _batch_sources(state.get('sources', []), MAP_BATCH_TOKENS * CHARS_PER_TOKEN)
+    workers = max(1, min(max_concurrency, len(batches)))
+    with ContextThreadPoolExecutor(max_workers=workers) as executor:
+        notes = list(executor.map(lambda batch: _map_sources(batch, state['topic'], llm), batches))
+    return "\n\n".join(notes)
+
+
+def needs_map_reduce(state):
+    source_chars = sum(len(s.title) + len(s.url) + len(s.content) for s in state.get('sources', []))
+    size = source_chars // CHARS_PER_TOKEN + estimate_tokens(state.get('pdf_context', ''))
+    return size > MAP_REDUCE_TOKEN_THRESHOLD
+
+
+def writer_node(state, llm):
+    # --- MAP-REDUCE FOR LARGE INPUTS ---
+    # The reduce step is the normal writer prompt, fed with the condensed notes
+    data = condense_sources(state, llm) if needs_map_reduce(state) else None
+    prompt = build_writer_prompt(state, data)
+
+    # --- 4. STREAM + CLEANUP ---
+    # llm.stream lets graph.stream(stream_mode="messages") forward tokens to the UI
+    cleaner = FenceCleaner()
+    parts = []
+    for chunk in llm.stream(prompt):
+        if isinstance(chunk.content, str):
+            parts.append(cleaner.feed(chunk.content))
+    parts.append(cleaner.flush())
+
+    return {"final_report": "".join(parts)}
\ No newline at end of file